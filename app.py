@@ -1,17 +1,185 @@
+import hashlib
+import orjson
+import re
 import sqlite3
-from flask import Flask, request, make_response, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify
+from flask_compress import Compress
+from werkzeug.exceptions import HTTPException
 from dotenv import load_dotenv
 from models.UserModel import UserModel
 from models.FavoriteModel import FavoriteModel
 from openweather_api import get_coords, get_forecast, get_air_pollution_forecast ,get_current_weather, get_air_pollution
+from utils.json_provider import ORJSONProvider
 from utils.logger import setup_logger
-from utils.sql import get_db_connection
+from utils.sql import get_db_connection, pool_stats
 
 load_dotenv()
 logger = setup_logger()
 
+HEALTH_BODY = b'{"status":"healthy"}'
+
+# Largest value SQLite stores in an INTEGER; bigger page parameters are rejected instead of overflowing
+SQLITE_MAX_INTEGER = 2**63 - 1
+
+# How long browsers and proxies may reuse a weather response; OpenWeather data refreshes every few minutes
+COORDS_MAX_AGE = 86400
+FORECAST_MAX_AGE = 600
+CURRENT_MAX_AGE = 120
+
+# Shared by /api/bundle so its independent OpenWeather calls run concurrently instead of back to back
+weather_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='openweather')
+
+# Letters (any script), digits, spaces and . , ' - only; rejected before any OpenWeather call.
+# [^\W_] is \w without the underscore.
+CITY_PATTERN = re.compile(r"^(?:[^\W_]|[ .,'-]){1,64}$")
+
 # Flask app initialization
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Compress JSON responses (forecasts can be tens of KB) for clients that accept zstd, br or gzip.
+# zstd is preferred since it compresses several times faster than br/gzip at a similar ratio.
+app.config['COMPRESS_ALGORITHM'] = ['zstd', 'br', 'gzip']
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+# gzip at 4 instead of 6 costs a few percent in size for noticeably less CPU per response
+app.config['COMPRESS_LEVEL'] = 4
+Compress(app)
+
+def json_fields(*names):
+    """
+    Parses the request's JSON body once and picks out the given fields.
+
+    A missing, malformed or non-object body yields None for every field, so handlers
+    answer with their usual 400 for missing input instead of failing on the parse.
+
+    Args:
+        *names (str): The field names to read.
+
+    Returns:
+        list: The value of each field, or None if it is absent.
+    """
+    # Bodies are read once, so parse the raw bytes directly instead of through get_json's cached copy
+    data = None
+    if request.is_json:
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+        except orjson.JSONDecodeError:
+            pass
+    if not isinstance(data, dict):
+        data = {}
+    return [data.get(name) for name in names]
+
+@lru_cache(maxsize=128)
+def _error_body(message):
+    return orjson.dumps({'error': message})
+
+def error_response(message, status):
+    """
+    Builds a JSON error response for a fixed message.
+
+    The body is serialized once per message and reused; a new Response is still created
+    for every request, since responses are modified on the way out.
+
+    Args:
+        message (str): The error message. Only pass constant strings, not per-request text.
+        status (int): The HTTP status code.
+
+    Returns:
+        Response: JSON response of the form {"error": message}.
+    """
+    return Response(_error_body(message), status=status, mimetype='application/json')
+
+def etag_matches(etag):
+    """
+    Checks whether the request's If-None-Match header lists the given ETag.
+
+    Args:
+        etag (str): The ETag of the current representation.
+
+    Returns:
+        bool: True if the client's cached copy is current and a 304 can be sent.
+    """
+    # Flask-Compress appends ':<algorithm>' to the ETag of compressed responses
+    return any(tag.split(':', 1)[0] == etag for tag in request.if_none_match.as_set(include_weak=True))
+
+def city_param():
+    """
+    Reads and validates the 'city' query parameter shared by the weather routes.
+
+    Returns:
+        tuple: (city, None) with surrounding whitespace stripped, or (None, Response)
+        with a 400 error if the city is missing or not a valid city name.
+    """
+    city = request.args.get('city', '').strip()
+    if not city:
+        logger.warning("Missing 'city' parameter in %s request.", request.path)
+        return None, error_response('City is required', 400)
+    if not CITY_PATTERN.match(city):
+        logger.warning("Rejected invalid city: %r", city)
+        return None, error_response('Invalid city name', 400)
+    return city, None
+
+def cacheable_json(data, max_age):
+    """
+    Builds a JSON response that downstream caches may store and reuse, answering
+    conditional requests with 304 when the client's copy is still current.
+
+    Args:
+        data: The data to serialize.
+        max_age (int): Seconds the response stays fresh.
+
+    Returns:
+        Response: JSON response with an ETag and a public Cache-Control max-age,
+        or an empty 304 if the If-None-Match header matches.
+    """
+    body = app.json.dumps(data).encode()
+    # BLAKE2 is fast in software and 8 bytes is plenty to tell versions of one resource apart
+    etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+    if etag_matches(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
+
+# Routes handle their expected failures (bad input, ValueError from the models) and let anything else reach these
+@app.errorhandler(sqlite3.IntegrityError)
+def handle_integrity_error(e):
+    """
+    Turns a database constraint violation into a JSON error.
+
+    Args:
+        e (sqlite3.IntegrityError): The error raised by a route.
+
+    Returns:
+        Response: 400 if a favorite referenced a user that doesn't exist, otherwise 500.
+    """
+    # Favorites reference users(id), so an unknown user_id fails the foreign key
+    if "FOREIGN KEY constraint failed" in str(e):
+        return error_response('User ID does not exist', 400)
+    logger.error("Integrity error in %s %s: %s", request.method, request.path, e)
+    return jsonify({'error': str(e)}), 500
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    """
+    Turns any other error raised by a route into a JSON 500.
+
+    Args:
+        e (Exception): The error raised by a route.
+
+    Returns:
+        Response: The HTTP error itself for aborts and unknown URLs, otherwise a JSON 500.
+    """
+    # 404s, 405s and other HTTP errors keep their own status and page
+    if isinstance(e, HTTPException):
+        return e
+    logger.error("Error in %s %s: %s", request.method, request.path, e)
+    return jsonify({'error': str(e)}), 500
 
 #############################
 #                           #
@@ -28,8 +196,8 @@ def healthcheck():
     Returns:
         JSON response indicating the health status of the service.
     """
-    logger.info('Health check')
-    return make_response(jsonify({'status': 'healthy'}), 200)
+    # Polled constantly by load balancers, so it returns a constant body and isn't logged
+    return Response(HEALTH_BODY, mimetype='application/json')
 
 # Route to check databse health
 @app.route('/api/db-check', methods=['GET'])
@@ -43,13 +211,25 @@ def db_check():
         404 error if there is an issue with the database.
     """
     try:
-        conn = get_db_connection()
-        conn.close()
+        # Borrows a pooled connection, so a probe doesn't open and close the database file
+        with get_db_connection() as conn:
+            conn.execute('SELECT 1').fetchone()
         logger.info("Database connection is OK.")
-        return make_response(jsonify({'database_status': 'healthy'}), 200)
+        return jsonify({'database_status': 'healthy'})
     except Exception as e:
-        logger.error(f"Database check failed: {e}")
-        return make_response(jsonify({'error': str(e)}), 404)
+        logger.error("Database check failed: %s", e)
+        return jsonify({'error': str(e)}), 404
+
+# Route to check readiness
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness route for load balancers; reports connection pool usage without querying the database.
+
+    Returns:
+        JSON response with the pool's size, open connections and idle connections.
+    """
+    return jsonify({'status': 'ready', 'pool': pool_stats()})
 
 #############################
 #                           #
@@ -74,29 +254,22 @@ def create_account():
         400 error if the username or password is missing, or the username is already taken.
         500 error if there is an issue with the database operation.
     """
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    username, password = json_fields('username', 'password')
 
     if not username or not password:
         logger.warning("Create account request missing username or password.")
-        return make_response(jsonify({'error': 'Username and password are required'}), 400)
+        return error_response('Username and password are required', 400)
 
     if not UserModel.check_password_validity(password):
         logger.warning("Password does not meet complexity requirements.")
-        return make_response(jsonify({'error': 'Password must be between 8 and 20 characters long, contain at least one letter and one digit.'}), 400)
+        return error_response('Password must be between 8 and 20 characters long, contain at least one letter and one digit.', 400)
 
-    if UserModel.is_username_taken(username):
-        logger.warning(f"Username {username} is already taken.")
-        return make_response(jsonify({'error': 'Username is already taken'}), 400)
-    
     try:
         UserModel.create_user(username, password)
-        logger.info(f"Account created for username: {username}")
-        return make_response(jsonify({'status': 'success', 'message': 'Account created'}), 201)
-    except Exception as e:
-        logger.error(f"Account creation failed: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+        logger.info("Account created for username: %s", username)
+        return jsonify({'status': 'success', 'message': 'Account created'}), 201
+    except ValueError:
+        return error_response('Username is already taken', 400)
 
 # Route to delete an existing account
 @app.route('/delete-account', methods=['DELETE'])
@@ -117,24 +290,17 @@ def delete_account():
         404 error if the user does not exist.
         500 error if there is an issue with the database operation.
     """
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    username, password = json_fields('username', 'password')
 
     if not username or not password:
-        return make_response(jsonify({'error': 'Username and password are required'}), 400)
+        return error_response('Username and password are required', 400)
 
-    try:
-        # Check if the user exists and password is correct before deletion
-        if not UserModel.authenticate_user(username, password):
-            return make_response(jsonify({'error': 'Incorrect password or user not found'}), 401)
-        UserModel.delete_user(username)
-        logger.info(f"Account deleted for username: {username}")
-        return make_response(jsonify({'status': 'success', 'message': 'Account deleted'}), 200)
-    
-    except Exception as e:
-        logger.error(f"Account deletion failed: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    # Check if the user exists and password is correct before deletion
+    if not UserModel.authenticate_user(username, password):
+        return error_response('Incorrect password or user not found', 401)
+    UserModel.delete_user(username)
+    logger.info("Account deleted for username: %s", username)
+    return jsonify({'status': 'success', 'message': 'Account deleted'})
 
 # Route to login to an account
 @app.route('/login', methods=['GET'])
@@ -155,25 +321,19 @@ def login():
         401 error if the password is incorrect.
         500 error if there is an issue with the database operation.
     """
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    username, password = json_fields('username', 'password')
 
     if not username or not password:
         logger.warning("Login request missing username or password.")
-        return make_response(jsonify({'error': 'Username and password are required'}), 400)
+        return error_response('Username and password are required', 400)
 
-    try:
-        is_authenticated = UserModel.authenticate_user(username, password)
-        if is_authenticated:
-            logger.info(f"User '{username}' logged in successfully.")
-            return make_response(jsonify({'status': 'success', 'message': 'Login successful'}), 200)
-        else:
-            logger.warning(f"Login failed for user '{username}': Incorrect password.")
-            return make_response(jsonify({'error': 'Invalid username or password'}), 401)
-    except Exception as e:
-        logger.error(f"Login failed: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    is_authenticated = UserModel.authenticate_user(username, password)
+    if is_authenticated:
+        logger.info("User '%s' logged in successfully.", username)
+        return jsonify({'status': 'success', 'message': 'Login successful'})
+    else:
+        logger.warning("Login failed for user '%s': Incorrect password.", username)
+        return error_response('Invalid username or password', 401)
 
 # Route to update password for an account
 @app.route('/update-password', methods=['PUT'])
@@ -195,30 +355,23 @@ def update_password():
         404 error if the username does not exist.
         500 error if there is an issue with the database operation.
     """
-    data = request.get_json()
-    username = data.get('username')
-    old_password = data.get('old_password')
-    new_password = data.get('new_password')
+    username, old_password, new_password = json_fields('username', 'old_password', 'new_password')
 
     if not username or not old_password or not new_password:
         logger.warning("Update password request missing parameters.")
-        return make_response(jsonify({'error': 'Username, old password, and new password are required'}), 400)
+        return error_response('Username, old password, and new password are required', 400)
 
     if not UserModel.check_password_validity(new_password):
         logger.warning("New password does not meet complexity requirements.")
-        return make_response(jsonify({'error': 'New password must be between 8 and 20 characters long, contain at least one letter and one digit.'}), 400)
+        return error_response('New password must be between 8 and 20 characters long, contain at least one letter and one digit.', 400)
     
-    try:
-        # Check if old password is correct
-        if not UserModel.authenticate_user(username, old_password):
-            return make_response(jsonify({'error': 'Old password is incorrect'}), 401)
+    # Check if old password is correct
+    if not UserModel.authenticate_user(username, old_password):
+        return error_response('Old password is incorrect', 401)
 
-        UserModel.update_password(username, new_password)
-        logger.info(f"Password updated for user '{username}'.")
-        return make_response(jsonify({'status': 'success', 'message': 'Password updated'}), 200)
-    except Exception as e:
-        logger.error(f"Password update failed: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    UserModel.update_password(username, new_password)
+    logger.info("Password updated for user '%s'.", username)
+    return jsonify({'status': 'success', 'message': 'Password updated'})
 
 # Route to get all accounts/users
 @app.route('/get-all-users', methods=['GET'])
@@ -232,15 +385,11 @@ def get_all_users():
     Raises:
         500 error if there is an issue fetching the users.
     """
-    try:
-        users = UserModel.get_all_users()
-        if users:
-            return make_response(jsonify({'users': users}), 200)
-        else:
-            return make_response(jsonify({'message': 'No users found'}), 404)
-    except Exception as e:
-        logger.error(f"Error fetching users: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    users = UserModel.get_all_users()
+    if users:
+        return jsonify({'users': users})
+    else:
+        return jsonify({'message': 'No users found'}), 404
 
 #############################
 #                           #
@@ -265,31 +414,55 @@ def add_favorite():
         400 error if missing input, or location already exists for that user.
         500 error if there is an issue adding the favorite to the database.
     """
+    user_id, location = json_fields('user_id', 'location')
+
+    if not user_id or not location:
+        logger.warning("user_id or location missing in request.")
+        return error_response('user_id and location are required', 400)
+
     try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        location = data.get('location')
+        FavoriteModel.add_favorite(user_id, location)
+        logger.info("Favorite location '%s' added for user %s.", location, user_id)
+        return jsonify({'status': 'success', 'message': 'Favorite location added'}), 201
+    except ValueError as e:
+        logger.warning("Error adding favorite for user %s: %s", user_id, e)
+        return jsonify({'error': str(e)}), 400
 
-        if not user_id or not location:
-            logger.warning("user_id or location missing in request.")
-            return make_response(jsonify({'error': 'user_id and location are required'}), 400)
+# Route to add several favorite locations at once
+@app.route('/api/add-favorites-bulk', methods=['POST'])
+def add_favorites_bulk():
+    """
+    POST: Adds several favorite locations for a user in a single transaction.
 
-        try:
-            FavoriteModel.add_favorite(user_id, location)
-            logger.info(f"Favorite location '{location}' added for user {user_id}.")
-            return make_response(jsonify({'status': 'success', 'message': 'Favorite location added'}), 201)
-        except ValueError as e:
-            logger.warning(f"Error adding favorite for user {user_id}: {e}")
-            return make_response(jsonify({'error': str(e)}), 400)
-        
-    except sqlite3.IntegrityError as e:
-        # Catch foreign key violation
-        if "FOREIGN KEY constraint failed" in str(e):
-            return jsonify({'error': 'User ID does not exist'}), 400
-        return jsonify({'error': str(e)}), 500
-    except Exception as e:
-        logger.error(f"Error adding favorite: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    Expected JSON Input:
+        - user_id (str): The ID of the user adding the favorite locations.
+        - locations (list of str): The locations to be saved as favorites.
+
+    Returns:
+        Response: JSON response with status, message and the number of favorites added.
+        Locations that are already favorites are skipped.
+
+    Raises:
+        400 error if missing input, locations is not a list of strings, or a location is blank.
+        500 error if there is an issue adding the favorites to the database.
+    """
+    user_id, locations = json_fields('user_id', 'locations')
+
+    if not user_id or not locations:
+        logger.warning("user_id or locations missing in request.")
+        return error_response('user_id and locations are required', 400)
+
+    if not isinstance(locations, list) or not all(isinstance(loc, str) for loc in locations):
+        logger.warning("Invalid locations in request.")
+        return error_response('locations must be a list of strings', 400)
+
+    try:
+        added = FavoriteModel.add_favorites_bulk(user_id, locations)
+        logger.info("%s favorite(s) added for user %s.", added, user_id)
+        return jsonify({'status': 'success', 'message': 'Favorite locations added', 'added': added}), 201
+    except ValueError as e:
+        logger.warning("Error adding favorites for user %s: %s", user_id, e)
+        return jsonify({'error': str(e)}), 400
 
 # Route to remove a favorite location for a user
 @app.route('/api/remove-favorite', methods=['DELETE'])
@@ -308,26 +481,19 @@ def remove_favorite():
         400 error if missing input or location not found.
         500 error if there is an issue removing the favorite from the database.
     """
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        location = data.get('location')
-
-        if not user_id or not location:
-            logger.warning("Missing user_id or location in request.")
-            return make_response(jsonify({'error': 'user_id and location are required'}), 400)
+    user_id, location = json_fields('user_id', 'location')
 
-        try:
-            FavoriteModel.remove_favorite(user_id, location)
-            logger.info(f"Favorite location '{location}' removed for user {user_id}.")
-            return make_response(jsonify({'status': 'success', 'message': 'Favorite location removed'}), 200)
-        except ValueError as e:
-            logger.warning(f"Error removing favorite for user {user_id}: {e}")
-            return make_response(jsonify({'error': str(e)}), 400)
+    if not user_id or not location:
+        logger.warning("Missing user_id or location in request.")
+        return error_response('user_id and location are required', 400)
 
-    except Exception as e:
-        logger.error(f"Error removing favorite: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    try:
+        FavoriteModel.remove_favorite(user_id, location)
+        logger.info("Favorite location '%s' removed for user %s.", location, user_id)
+        return jsonify({'status': 'success', 'message': 'Favorite location removed'})
+    except ValueError as e:
+        logger.warning("Error removing favorite for user %s: %s", user_id, e)
+        return jsonify({'error': str(e)}), 400
 
 # Route to update a favorite for a user
 @app.route('/api/update-favorite', methods=['PUT'])
@@ -349,63 +515,52 @@ def update_favorite():
         409 error if the new location already exists as a favorite.
         500 error if there is an issue updating the favorite location in the database.
     """
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        old_location = data.get('old_location')
-        new_location = data.get('new_location')
+    user_id, old_location, new_location = json_fields('user_id', 'old_location', 'new_location')
 
-        if not user_id or not old_location or not new_location:
-            logger.warning("Missing user_id, old_location, or new_location in request.")
-            return make_response(jsonify({'error': 'user_id, old_location, and new_location are required'}), 400)
+    if not user_id or not old_location or not new_location:
+        logger.warning("Missing user_id, old_location, or new_location in request.")
+        return error_response('user_id, old_location, and new_location are required', 400)
 
-        try:
-            FavoriteModel.update_favorite(user_id, old_location, new_location)
-            logger.info(f"Favorite location updated from '{old_location}' to '{new_location}' for user {user_id}.")
-            return make_response(jsonify({'status': 'success', 'message': f"'{old_location}' updated to '{new_location}'"}), 200)
-        except ValueError as e:
-            logger.warning(f"Error updating favorite for user {user_id}: {e}")
-            return make_response(jsonify({'error': str(e)}), 400)
-
-    except Exception as e:
-        logger.error(f"Error updating favorite: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    try:
+        FavoriteModel.update_favorite(user_id, old_location, new_location)
+        logger.info("Favorite location updated from '%s' to '%s' for user %s.", old_location, new_location, user_id)
+        return jsonify({'status': 'success', 'message': f"'{old_location}' updated to '{new_location}'"})
+    except ValueError as e:
+        logger.warning("Error updating favorite for user %s: %s", user_id, e)
+        return jsonify({'error': str(e)}), 400
 
 # Route to clear all favorites for a user
 @app.route('/api/clear-favorites', methods=['DELETE'])
 def clear_favorites():
     """
-    POST: Removes all favorite locations from from the database.
+    DELETE: Removes all favorite locations, or only the listed ones, from the database.
 
     Expected JSON Input:
         - user_id (str): The ID of the user whose favorite locations are to be removed.
+        - locations (list of str, optional): Only remove these locations, in one transaction.
 
     Returns:
-        Response: JSON response with status and message.
+        Response: JSON response with status, message and the number of favorites removed.
 
     Raises:
-        400 error if missing input.
+        400 error if missing input or locations is not a list of strings.
         500 error if there is an issue removing the favorites from the database.
     """
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
+    user_id, locations = json_fields('user_id', 'locations')
 
-        if not user_id:
-            logger.warning("Missing user_id in request.")
-            return make_response(jsonify({'error': 'user_id is required'}), 400)
+    if not user_id:
+        logger.warning("Missing user_id in request.")
+        return error_response('user_id is required', 400)
 
-        try:
-            FavoriteModel.clear_favorites(user_id)
-            logger.info(f"All favorites cleared for user {user_id}.")
-            return make_response(jsonify({'status': 'success', 'message': 'All favorite locations removed'}), 200)
-        except Exception as e:
-            logger.error(f"Error clearing favorites for user {user_id}: {e}")
-            return make_response(jsonify({'error': str(e)}), 500)
+    if locations is not None and (not isinstance(locations, list) or not all(isinstance(loc, str) for loc in locations)):
+        logger.warning("Invalid locations in request.")
+        return error_response('locations must be a list of strings', 400)
 
-    except Exception as e:
-        logger.error(f"Error clearing favorites: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    removed = FavoriteModel.clear_favorites(user_id, locations)
+    logger.info("%s favorite(s) cleared for user %s.", removed, user_id)
+    if locations is not None:
+        return jsonify({'status': 'success', 'message': 'Favorite locations removed', 'removed': removed})
+    return jsonify({'status': 'success', 'message': 'All favorite locations removed', 'removed': removed})
 
 # Route to get all favorites for a user
 @app.route('/api/get-favorites', methods=['GET'])
@@ -415,38 +570,52 @@ def get_favorites():
 
     Query Parameters:
         - user_id (str): The ID of the user whose favorites are being request
+        - limit (int, optional): Maximum number of favorites to return. Defaults to all.
+        - offset (int, optional): Number of favorites to skip. Defaults to 0.
 
     Returns:
-        Response: JSON response with a list of favorite locations.
+        Response: JSON response with a list of favorite locations and a weak ETag,
+        or an empty 304 if the If-None-Match header still matches.
     
     Raises:
-        400 error if missing input.
+        400 error if missing input or limit/offset are not non-negative integers.
         500 error if there is an issue fetching favorites
     """
-    try:
-        user_id = request.args.get('user_id')
-
-        if not user_id:
-            logger.warning("Missing user_id in request.")
-            return make_response(jsonify({'error': 'user_id is required'}), 400)
-
-        try:
-            favorites = FavoriteModel.get_favorites(user_id)
-            if not favorites:
-                return make_response(jsonify({'message': 'No favorites found'}), 404)
-
-            favorite_locations = [
-                {'id': fav[0], 'location': fav[1], 'created_at': fav[2], 'updated_at': fav[3]} for fav in favorites
-            ]
-            logger.info(f"Returning {len(favorites)} favorites for user {user_id}.")
-            return make_response(jsonify({'favorites': favorite_locations}), 200)
-        except Exception as e:
-            logger.error(f"Error fetching favorites for user {user_id}: {e}")
-            return make_response(jsonify({'error': str(e)}), 500)
-
-    except Exception as e:
-        logger.error(f"Error fetching favorites: {e}")
-        return make_response(jsonify({'error': str(e)}), 500)
+    user_id = request.args.get('user_id')
+    limit = request.args.get('limit', None)
+    offset = request.args.get('offset', '0')
+
+    if not user_id:
+        logger.warning("Missing user_id in request.")
+        return error_response('user_id is required', 400)
+
+    # isdecimal() rejects superscripts and other digits int() can't parse; the bound keeps values within SQLite's INTEGER
+    if (limit is not None and not limit.isdecimal()) or not offset.isdecimal():
+        logger.warning("Invalid limit or offset in request.")
+        return error_response('limit and offset must be non-negative integers', 400)
+    limit = None if limit is None else int(limit)
+    offset = int(offset)
+    if (limit is not None and limit > SQLITE_MAX_INTEGER) or offset > SQLITE_MAX_INTEGER:
+        logger.warning("Out of range limit or offset in request.")
+        return error_response('limit and offset must be non-negative integers', 400)
+
+    # The version changes on every write to this user's favorites, so it identifies the response
+    version = FavoriteModel.get_favorites_version(user_id)
+    etag = f"{user_id}-{version}-{limit}-{offset}"
+    if etag_matches(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    # The list arrives already serialized by SQLite and is wrapped without being parsed
+    favorites_json = FavoriteModel.get_favorites_json(user_id, limit, offset, version)
+    if favorites_json == '[]':
+        return jsonify({'message': 'No favorites found'}), 404
+
+    logger.info("Returning favorites for user %s.", user_id)
+    response = Response(f'{{"favorites":{favorites_json}}}', mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    return response
 
 #############################
 #                           #
@@ -468,20 +637,20 @@ def coords():
         Response: JSON response containing latitude and longitude.
     
     Raises:
-        400 error if 'city' is missing in the request.
+        400 error if 'city' is missing or not a valid city name.
         500 error if there is an issue fetching coordinates.
     """
-    city = request.args.get('city')
-    country_code = request.args.get('country_code', None)
+    city, error = city_param()
+    if error:
+        return error
 
-    if not city:
-        return make_response(jsonify({'error': 'City is required'}), 400)
+    country_code = request.args.get('country_code', None)
 
     coords = get_coords(city, country_code)
     if coords:
-        return make_response(jsonify({'coordinates': coords}), 200)
+        return cacheable_json({'coordinates': coords}, COORDS_MAX_AGE)
     else:
-        return make_response(jsonify({'error': 'Could not fetch coordinates'}), 500)
+        return error_response('Could not fetch coordinates', 500)
 
 # Route to get weather forecast for a city
 @app.route('/api/forecast', methods=['GET'])
@@ -498,33 +667,32 @@ def forecast():
         Response: JSON response containing weather forecast.
 
     Raises:
-        400 error if 'city' is missing in the request.
+        400 error if 'city' is missing or not a valid city name.
         500 error if there is an issue fetching coordinates or forecast data.
     """
-    city = request.args.get('city')
+    city, error = city_param()
+    if error:
+        return error
+
     country_code = request.args.get('country_code', None)
     units = request.args.get('units', 'imperial')
 
-    logger.info(f"Forecast request received for city: {city}, country_code: {country_code}, units: {units}")
-
-    if not city:
-        logger.warning("Missing 'city' parameter in forecast request.")
-        return make_response(jsonify({'error': 'City is required'}), 400)
+    logger.info("Forecast request received for city: %s, country_code: %s, units: %s", city, country_code, units)
 
     coords = get_coords(city, country_code)
     if not coords:
-        logger.error(f"Failed to fetch coordinates for city: {city}, country_code: {country_code}")
-        return make_response(jsonify({'error': 'Could not fetch coordinates for the city'}), 500)
+        logger.error("Failed to fetch coordinates for city: %s, country_code: %s", city, country_code)
+        return error_response('Could not fetch coordinates for the city', 500)
 
-    logger.info(f"Coordinates for city {city}: {coords}")
+    logger.info("Coordinates for city %s: %s", city, coords)
 
     forecast_data = get_forecast(coords['lat'], coords['lon'], units)
     if forecast_data:
-        logger.info(f"Successfully fetched forecast data for city: {city}")
-        return make_response(jsonify(forecast_data), 200)
+        logger.info("Successfully fetched forecast data for city: %s", city)
+        return cacheable_json(forecast_data, FORECAST_MAX_AGE)
     else:
-        logger.error(f"Failed to fetch forecast data for city: {city}, coordinates: {coords}")
-        return make_response(jsonify({'error': 'Could not fetch forecast data'}), 500)
+        logger.error("Failed to fetch forecast data for city: %s, coordinates: %s", city, coords)
+        return error_response('Could not fetch forecast data', 500)
 
 # Route to get air pollution forecast data for a city
 @app.route('/api/air-pollution-forecast', methods=['GET'])
@@ -540,32 +708,31 @@ def air_pollution_forecast():
         Response: JSON response containing air pollution forecast data.
     
     Raises:
-        400 error if 'city' is missing in the request.
+        400 error if 'city' is missing or not a valid city name.
         500 error if there is an issue fetching coordinates or pollution forecast data.
     """
-    city = request.args.get('city')
-    country_code = request.args.get('country_code', None)
+    city, error = city_param()
+    if error:
+        return error
 
-    logger.info(f"Air pollution forecast request received for city: {city}, country_code: {country_code}")
+    country_code = request.args.get('country_code', None)
 
-    if not city:
-        logger.warning("Missing 'city' parameter in air pollution forecast request.")
-        return make_response(jsonify({'error': 'City is required'}), 400)
+    logger.info("Air pollution forecast request received for city: %s, country_code: %s", city, country_code)
 
     coords = get_coords(city, country_code)
     if not coords:
-        logger.error(f"Failed to fetch coordinates for city: {city}, country_code: {country_code}")
-        return make_response(jsonify({'error': 'Could not fetch coordinates for the city'}), 500)
+        logger.error("Failed to fetch coordinates for city: %s, country_code: %s", city, country_code)
+        return error_response('Could not fetch coordinates for the city', 500)
 
-    logger.info(f"Coordinates for city {city}: {coords}")
+    logger.info("Coordinates for city %s: %s", city, coords)
 
     pollution_forecast_data = get_air_pollution_forecast(coords['lat'], coords['lon'])
     if pollution_forecast_data:
-        logger.info(f"Successfully fetched air pollution forecast data for city: {city}")
-        return make_response(jsonify(pollution_forecast_data), 200)
+        logger.info("Successfully fetched air pollution forecast data for city: %s", city)
+        return cacheable_json(pollution_forecast_data, FORECAST_MAX_AGE)
     else:
-        logger.error(f"Failed to fetch air pollution forecast data for city: {city}, coordinates: {coords}")
-        return make_response(jsonify({'error': 'Could not fetch air pollution forecast data'}), 500)
+        logger.error("Failed to fetch air pollution forecast data for city: %s, coordinates: %s", city, coords)
+        return error_response('Could not fetch air pollution forecast data', 500)
 
 # Route to get current weather for a city
 @app.route('/api/weather', methods=['GET'])
@@ -582,33 +749,32 @@ def current_weather():
         Response: JSON response containing current weather data.
     
     Raises:
-        400 error if 'city' is missing in the request.
+        400 error if 'city' is missing or not a valid city name.
         500 error if there is an issue fetching coordinates or current weather data.
     """
-    city = request.args.get('city')
+    city, error = city_param()
+    if error:
+        return error
+
     country_code = request.args.get('country_code', None)
     units = request.args.get('units', 'imperial')
 
-    logger.info(f"Current weather request received for city: {city}, country_code: {country_code}, units: {units}")
-
-    if not city:
-        logger.warning("Missing 'city' parameter in current weather request.")
-        return make_response(jsonify({'error': 'City is required'}), 400)
+    logger.info("Current weather request received for city: %s, country_code: %s, units: %s", city, country_code, units)
 
     coords = get_coords(city, country_code)
     if not coords:
-        logger.error(f"Failed to fetch coordinates for city: {city}, country_code: {country_code}")
-        return make_response(jsonify({'error': 'Could not fetch coordinates for the city'}), 500)
+        logger.error("Failed to fetch coordinates for city: %s, country_code: %s", city, country_code)
+        return error_response('Could not fetch coordinates for the city', 500)
 
-    logger.info(f"Coordinates for city {city}: {coords}")
+    logger.info("Coordinates for city %s: %s", city, coords)
 
     weather_data = get_current_weather(coords['lat'], coords['lon'], units)
     if weather_data:
-        logger.info(f"Successfully fetched current weather data for city: {city}")
-        return make_response(jsonify(weather_data), 200)
+        logger.info("Successfully fetched current weather data for city: %s", city)
+        return cacheable_json(weather_data, CURRENT_MAX_AGE)
     else:
-        logger.error(f"Failed to fetch current weather data for city: {city}, coordinates: {coords}")
-        return make_response(jsonify({'error': 'Could not fetch current weather data'}), 500)
+        logger.error("Failed to fetch current weather data for city: %s, coordinates: %s", city, coords)
+        return error_response('Could not fetch current weather data', 500)
 
 # Route to get air pollution data for a city
 @app.route('/api/air-pollution', methods=['GET'])
@@ -624,32 +790,83 @@ def air_pollution():
         Response: JSON response containing air pollution data.
     
     Raises:
-        400 error if 'city' is missing in the request.
+        400 error if 'city' is missing or not a valid city name.
         500 error if there is an issue fetching coordinates or air pollution data.
     """
-    city = request.args.get('city')
+    city, error = city_param()
+    if error:
+        return error
+
     country_code = request.args.get('country_code', None)
 
-    logger.info(f"Air pollution request received for city: {city}, country_code: {country_code}")
-
-    if not city:
-        logger.warning("Missing 'city' parameter in air pollution request.")
-        return make_response(jsonify({'error': 'City is required'}), 400)
+    logger.info("Air pollution request received for city: %s, country_code: %s", city, country_code)
 
     coords = get_coords(city, country_code)
     if not coords:
-        logger.error(f"Failed to fetch coordinates for city: {city}, country_code: {country_code}")
-        return make_response(jsonify({'error': 'Could not fetch coordinates for the city'}), 500)
+        logger.error("Failed to fetch coordinates for city: %s, country_code: %s", city, country_code)
+        return error_response('Could not fetch coordinates for the city', 500)
 
-    logger.info(f"Coordinates for city {city}: {coords}")
+    logger.info("Coordinates for city %s: %s", city, coords)
 
     pollution_data = get_air_pollution(coords['lat'], coords['lon'])
     if pollution_data:
-        logger.info(f"Successfully fetched air pollution data for city: {city}")
-        return make_response(jsonify(pollution_data), 200)
+        logger.info("Successfully fetched air pollution data for city: %s", city)
+        return cacheable_json(pollution_data, CURRENT_MAX_AGE)
     else:
-        logger.error(f"Failed to fetch air pollution data for city: {city}, coordinates: {coords}")
-        return make_response(jsonify({'error': 'Could not fetch air pollution data'}), 500)
+        logger.error("Failed to fetch air pollution data for city: %s, coordinates: %s", city, coords)
+        return error_response('Could not fetch air pollution data', 500)
+
+# Route to get forecast, current weather and air pollution for a city in one request
+@app.route('/api/bundle', methods=['GET'])
+def weather_bundle():
+    """
+    GET: Fetch forecast, current weather and air pollution data for a city in one request.
+
+    The city is geocoded once, then the three OpenWeather lookups run concurrently.
+
+    Query Parameters:
+        - city (str): Name of the city.
+        - country_code (str, optional): Country code.
+        - units (str, optional): Units of measurement (standard, metric, imperial). Defaults to "imperial".
+
+    Returns:
+        Response: JSON response with 'forecast', 'current_weather' and 'air_pollution' data.
+    
+    Raises:
+        400 error if 'city' is missing or not a valid city name.
+        500 error if there is an issue fetching coordinates or any of the weather data.
+    """
+    city, error = city_param()
+    if error:
+        return error
+
+    country_code = request.args.get('country_code', None)
+    units = request.args.get('units', 'imperial')
+
+    logger.info("Weather bundle request received for city: %s, country_code: %s, units: %s", city, country_code, units)
+
+    coords = get_coords(city, country_code)
+    if not coords:
+        logger.error("Failed to fetch coordinates for city: %s, country_code: %s", city, country_code)
+        return error_response('Could not fetch coordinates for the city', 500)
+
+    lat, lon = coords['lat'], coords['lon']
+    forecast = weather_pool.submit(get_forecast, lat, lon, units)
+    current = weather_pool.submit(get_current_weather, lat, lon, units)
+    pollution = weather_pool.submit(get_air_pollution, lat, lon)
+
+    bundle = {
+        'forecast': forecast.result(),
+        'current_weather': current.result(),
+        'air_pollution': pollution.result()
+    }
+    missing = [name for name, data in bundle.items() if not data]
+    if missing:
+        logger.error("Failed to fetch %s for city: %s, coordinates: %s", ', '.join(missing), city, coords)
+        return error_response('Could not fetch weather data', 500)
+
+    logger.info("Successfully fetched weather bundle for city: %s", city)
+    return cacheable_json(bundle, CURRENT_MAX_AGE)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
\ No newline at end of file
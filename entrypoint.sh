@@ -12,5 +12,5 @@ else
     echo "setup_db.py not found, skipping database setup"
 fi
 
-# Start the Python application
-exec python app.py
\ No newline at end of file
+# Start the application under Gunicorn (settings in gunicorn.conf.py)
+exec gunicorn -c gunicorn.conf.py wsgi:application
\ No newline at end of file
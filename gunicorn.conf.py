@@ -0,0 +1,19 @@
+# Gunicorn settings for serving wsgi:application in production (see entrypoint.sh)
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+# One process per core, each serving requests from a pool of threads. Threads suit this app: OpenWeather
+# calls and SQLite release the GIL while they wait, and so does bcrypt while hashing. Gevent would not make
+# sqlite3 or bcrypt cooperative. Keep threads at or below DB_POOL_SIZE so requests don't queue for a connection.
+workers = int(os.getenv('GUNICORN_WORKERS', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Each worker imports the app itself, so connection pools, caches and the log listener thread are never
+# shared across a fork
+preload_app = False
+
+# Idle keep-alive connections from a reverse proxy are held briefly instead of reconnecting per request
+keepalive = 5
@@ -1,8 +1,25 @@
+import sqlite3
+import threading
+from cachetools import TTLCache
 from utils.logger import setup_logger
 from utils.sql import get_db_connection
 
 logger = setup_logger()
 
+# Short-lived cache of each user's full favorites list as JSON, tagged with the favorites version it was read at
+# and dropped whenever that user's favorites change
+_favorites_cache = TTLCache(maxsize=1024, ttl=5)
+_favorites_cache_lock = threading.Lock()
+
+def _invalidate_favorites(user_id):
+    with _favorites_cache_lock:
+        _favorites_cache.pop(f"{user_id}:json", None)
+
+def _normalize_location(location):
+    # Trim and collapse whitespace so "New York" and " New  York\n" are one favorite under the unique index.
+    # Case is kept because the stored value is what users see listed.
+    return ' '.join(location.split()) if isinstance(location, str) else location
+
 class FavoriteModel:
     @staticmethod
     def add_favorite(user_id, location):
@@ -14,27 +31,57 @@ class FavoriteModel:
             location (str): The location to be added as a favorite.
 
         Raises:
-            ValueError: If the location is already a favorite for this user.
+            ValueError: If the location is blank or already a favorite for this user.
         """
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
+        location = _normalize_location(location)
+        if not location:
+            raise ValueError("Location cannot be blank.")
 
-            # Check if the location already exists for the user
-            """
-            cursor.execute('SELECT id FROM favorites WHERE user_id = ? AND location = ?', (user_id, location))
-            existing_favorite = cursor.fetchone()
+        with get_db_connection() as conn:
+            # The unique (user_id, location) index turns a duplicate into a no-op instead of a second row
+            cursor = conn.execute(
+                'INSERT INTO favorites (user_id, location) VALUES (?, ?) ON CONFLICT (user_id, location) DO NOTHING',
+                (user_id, location)
+            )
 
-            if existing_favorite:
-                logger.warning(f"Favorite location '{location}' already exists for user {user_id}.")
+            if cursor.rowcount == 0:
+                logger.warning("Favorite location '%s' already exists for user %s.", location, user_id)
                 raise ValueError(f"'{location}' is already a favorite location for this user.")
-            """
 
-            cursor.execute(
-                'INSERT INTO favorites (user_id, location) VALUES (?, ?)', 
-                (user_id, location)
+            logger.info("User %s added new favorite location: %s", user_id, location)
+            conn.commit()
+        _invalidate_favorites(user_id)
+
+    @staticmethod
+    def add_favorites_bulk(user_id, locations):
+        """
+        Add several favorite locations for a user in one transaction.
+        
+        Args:
+            user_id (int): The ID of the user.
+            locations (list): The locations to be added as favorites.
+
+        Returns:
+            int: The number of favorites added; locations that are already favorites are skipped.
+
+        Raises:
+            ValueError: If any location is blank.
+        """
+        locations = [_normalize_location(location) for location in locations]
+        if not all(locations):
+            raise ValueError("Location cannot be blank.")
+
+        with get_db_connection() as conn:
+            # One commit for the whole batch; existing favorites are skipped by the unique index
+            cursor = conn.executemany(
+                'INSERT INTO favorites (user_id, location) VALUES (?, ?) ON CONFLICT (user_id, location) DO NOTHING',
+                [(user_id, location) for location in locations]
             )
-            logger.info(f"User {user_id} added new favorite location: {location}")
+            added = cursor.rowcount
             conn.commit()
+            logger.info("User %s added %s favorite location(s).", user_id, added)
+        _invalidate_favorites(user_id)
+        return added
 
     @staticmethod
     def remove_favorite(user_id, location):
@@ -48,22 +95,21 @@ class FavoriteModel:
         Raises:
             ValueError: If the location is not a favorite for this user.
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        location = _normalize_location(location)
 
-        # Check if the location exists for the user
-        cursor.execute('SELECT id FROM favorites WHERE user_id = ? AND location = ?', (user_id, location))
-        favorite = cursor.fetchone()
-        
-        if not favorite:
-            logger.warning(f"User {user_id} tried to remove a non-existing favorite: {location}")
-            conn.close()
-            raise ValueError(f"'{location}' is not a favorite location for this user.")
-        
-        cursor.execute('DELETE FROM favorites WHERE user_id = ? AND location = ?', (user_id, location))
-        conn.commit()
-        logger.info(f"User {user_id} removed favorite location: {location}")
-        conn.close()
+        with get_db_connection() as conn:
+            # Delete and check for existence in one statement
+            favorite = conn.execute(
+                'DELETE FROM favorites WHERE user_id = ? AND location = ? RETURNING id', (user_id, location)
+            ).fetchone()
+
+            if not favorite:
+                logger.warning("User %s tried to remove a non-existing favorite: %s", user_id, location)
+                raise ValueError(f"'{location}' is not a favorite location for this user.")
+
+            conn.commit()
+            logger.info("User %s removed favorite location: %s", user_id, location)
+        _invalidate_favorites(user_id)
 
     @staticmethod
     def update_favorite(user_id, old_location, new_location):
@@ -76,66 +122,138 @@ class FavoriteModel:
             new_location (str): The new location to replace the old one.
 
         Raises:
-            ValueError: If the new location is already a favorite or if the old location is not a favorite.
+            ValueError: If the new location is blank or already a favorite, or if the old location is not a favorite.
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        old_location = _normalize_location(old_location)
+        new_location = _normalize_location(new_location)
+        if not new_location:
+            raise ValueError("Location cannot be blank.")
+
+        with get_db_connection() as conn:
+            # The unique (user_id, location) index rejects renaming onto an existing favorite
+            try:
+                cursor = conn.execute('''
+                    UPDATE favorites SET location = ?, updated_at = CURRENT_TIMESTAMP 
+                    WHERE user_id = ? AND location = ?
+                ''', (new_location, user_id, old_location))
+            except sqlite3.IntegrityError:
+                logger.warning("User %s tried to add an already existing favorite: %s", user_id, new_location)
+                raise ValueError(f"'{new_location}' is already a favorite location for this user.")
+
+            if cursor.rowcount == 0:
+                logger.warning("User %s tried to update a non-existing favorite: %s", user_id, old_location)
+                raise ValueError(f"'{old_location}' is not a favorite location for this user.")
+
+            conn.commit()
+            logger.info("User %s updated favorite location '%s' to '%s'", user_id, old_location, new_location)
+        _invalidate_favorites(user_id)
 
+    @staticmethod
+    def clear_favorites(user_id, locations=None):
         """
-        # Check if the new location already exists for the user
-        cursor.execute('SELECT id FROM favorites WHERE user_id = ? AND location = ?', (user_id, new_location))
-        existing_favorite = cursor.fetchone()
+        Clear all favorite locations for a user, or only the given ones.
         
-        if existing_favorite:
-            logger.warning(f"User {user_id} tried to add an already existing favorite: {new_location}")
-            conn.close()
-            raise ValueError(f"'{new_location}' is already a favorite location for this user.")
+        Args:
+            user_id (int): The ID of the user.
+            locations (list, optional): The locations to remove. Defaults to None (all).
+
+        Returns:
+            int: The number of favorites removed.
         """
+        with get_db_connection() as conn:
+            if locations is None:
+                cursor = conn.execute('DELETE FROM favorites WHERE user_id = ?', (user_id,))
+            else:
+                # One transaction for the whole batch instead of a commit per location
+                cursor = conn.executemany(
+                    'DELETE FROM favorites WHERE user_id = ? AND location = ?',
+                    [(user_id, _normalize_location(location)) for location in locations]
+                )
+            # rowcount is summed across executemany, so both paths report the rows deleted without a second query
+            removed = cursor.rowcount
+            conn.commit()
+            logger.info("User %s cleared %s favorite location(s).", user_id, removed)
+        _invalidate_favorites(user_id)
+        return removed
 
-        cursor.execute('''
-            UPDATE favorites SET location = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE user_id = ? AND location = ?
-        ''', (new_location, user_id, old_location))
+    @staticmethod
+    def get_favorites(user_id, limit=None, offset=0):
+        """
+        Get the favorite locations for a user, optionally one page at a time.
+        
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): Maximum number of favorites to return. Defaults to None (all).
+            offset (int, optional): Number of favorites to skip. Defaults to 0.
 
-        if cursor.rowcount == 0:
-            logger.warning(f"User {user_id} tried to update a non-existing favorite: {old_location}")
-            conn.close()
-            raise ValueError(f"'{old_location}' is not a favorite location for this user.")
+        Returns:
+            List: A list of tuples representing the user's favorite locations.
+        """
+        with get_db_connection() as conn:
+            # A negative LIMIT means no limit in SQLite
+            favorites = conn.execute(
+                'SELECT id, location, created_at, updated_at FROM favorites WHERE user_id = ? ORDER BY id LIMIT ? OFFSET ?',
+                (user_id, -1 if limit is None else limit, offset)
+            ).fetchall()
 
-        conn.commit()
-        logger.info(f"User {user_id} updated favorite location '{old_location}' to '{new_location}'")
-        conn.close()
+        logger.info("Fetched %s favorite(s) for user %s.", len(favorites), user_id)
+        return favorites
 
     @staticmethod
-    def clear_favorites(user_id):
+    def get_favorites_json(user_id, limit=None, offset=0, version=None):
         """
-        Clear all favorite locations for a user.
-        
+        Get the favorite locations for a user as a JSON array built by SQLite, optionally one page at a time.
+
         Args:
             user_id (int): The ID of the user.
+            limit (int, optional): Maximum number of favorites to return. Defaults to None (all).
+            offset (int, optional): Number of favorites to skip. Defaults to 0.
+            version (int, optional): The user's current favorites version (see get_favorites_version).
+                The full list is only cached when it is given. Defaults to None.
+
+        Returns:
+            str: JSON array of objects with id, location, created_at and updated_at; '[]' if there are none.
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM favorites WHERE user_id = ?', (user_id,))
-        conn.commit()
-        logger.info(f"User {user_id} cleared all favorite locations.")
-        conn.close()
+        # Only the full, unpaged list is cached, tagged with the version it was read at. Another worker's
+        # write doesn't clear this process's cache, but it does bump the version, so the entry stops matching.
+        cacheable = limit is None and not offset and version is not None
+        if cacheable:
+            with _favorites_cache_lock:
+                cached = _favorites_cache.get(f"{user_id}:json")
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        with get_db_connection() as conn:
+            # SQLite serializes the rows itself, so no per-row tuples or dicts are built in Python
+            favorites_json = conn.execute(
+                '''
+                    SELECT json_group_array(json_object(
+                        'id', id, 'location', location, 'created_at', created_at, 'updated_at', updated_at
+                    ))
+                    FROM (
+                        SELECT id, location, created_at, updated_at FROM favorites
+                        WHERE user_id = ? ORDER BY id LIMIT ? OFFSET ?
+                    )
+                ''',
+                (user_id, -1 if limit is None else limit, offset)
+            ).fetchone()[0]
+
+        if cacheable:
+            with _favorites_cache_lock:
+                _favorites_cache[f"{user_id}:json"] = (version, favorites_json)
+        return favorites_json
 
     @staticmethod
-    def get_favorites(user_id):
+    def get_favorites_version(user_id):
         """
-        Get all favorite locations for a user.
+        Get the version counter of a user's favorites, which changes whenever they are modified.
         
         Args:
             user_id (int): The ID of the user.
 
         Returns:
-            List: A list of tuples representing the user's favorite locations.
+            int: The current version, or 0 if the user's favorites have never changed.
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, location, created_at, updated_at FROM favorites WHERE user_id = ?', (user_id,))
-        favorites = cursor.fetchall()
-        conn.close()
-        logger.info(f"Fetched {len(favorites)} favorite(s) for user {user_id}.")
-        return favorites
\ No newline at end of file
+        with get_db_connection() as conn:
+            row = conn.execute('SELECT version FROM favorites_version WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0] if row else 0
@@ -1,9 +1,8 @@
 class User:
-    def __init__(self, id, username, password_hash, salt):
+    def __init__(self, id, username, password_hash):
         self.id = id
         self.username = username
         self.password_hash = password_hash
-        self.salt = salt
     
     def to_dict(self):
         # Converts a User object to a dictionary.
@@ -1,11 +1,35 @@
 import bcrypt
+import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
 from models.User import User
 from utils.logger import setup_logger
 from utils.sql import get_db_connection
 
+load_dotenv()
 logger = setup_logger()
 
+# bcrypt work factor; each step up doubles the hashing time. Existing hashes are moved to it on their next login.
+BCRYPT_COST = int(os.getenv('BCRYPT_COST', '12'))
+
+# bcrypt releases the GIL while hashing, so hashes from different request threads can run in parallel.
+# The pool caps how many run at once in this worker process at the core count; request threads still wait on the
+# result. The cap is per process, so across all Gunicorn workers up to workers x cores hashes can run together.
+_bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='bcrypt')
+
+def _hash_password(password):
+    return _bcrypt_pool.submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_COST)).result()
+
+def _check_password(password, password_hash):
+    # Hashes are stored as bytes; rows written before that hold text
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('utf-8')
+    return _bcrypt_pool.submit(bcrypt.checkpw, password.encode('utf-8'), password_hash).result()
+
+# Checked against for unknown usernames so a failed login takes as long whether or not the user exists
+_DUMMY_HASH = bcrypt.hashpw(b'dummy-password', bcrypt.gensalt(rounds=BCRYPT_COST))
+
 class UserModel:
     @staticmethod
     def create_user(username, password):
@@ -17,33 +41,40 @@ class UserModel:
             username (str): The username of the user to be created.
             password (str): The password of the user to be created.
 
+        Returns:
+            int: The ID of the new user.
+
         Raises:
+            ValueError: If the username is already taken.
             sqlite3.Error: For general database errors.
         """
         if not username or not password:
             raise Exception(f"Invalid input: username and password are required")
         try:
-            salt = bcrypt.gensalt()
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
-
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO users (username, salt, password_hash) VALUES (?, ?, ?)',
-                (username, salt.decode(), password_hash.decode())
-            )
-            conn.commit()
-            conn.close()
-            logger.info(f"User '{username}' created successfully.")
+            password_hash = _hash_password(password)
+
+            with get_db_connection() as conn:
+                # A taken username inserts nothing and returns no row, so there's no separate existence check to race
+                row = conn.execute(
+                    'INSERT INTO users (username, password_hash) VALUES (?, ?) ON CONFLICT (username) DO NOTHING RETURNING id',
+                    (username, password_hash)
+                ).fetchone()
+                conn.commit()
         except sqlite3.IntegrityError as e:
-            logger.error(f"Integrity error creating user '{username}': {e}")
+            logger.error("Integrity error creating user '%s': %s", username, e)
             raise sqlite3.IntegrityError(f"User '{username}' already exists: {str(e)}")
         except sqlite3.Error as e:
-            logger.error(f"SQLite error creating user '{username}': {e}")
+            logger.error("SQLite error creating user '%s': %s", username, e)
             raise sqlite3.Error(f"Error creating user: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error creating user '{username}': {e}")
+            logger.error("Unexpected error creating user '%s': %s", username, e)
             raise Exception(f"Unexpected error: {str(e)}")
+
+        if row is None:
+            logger.warning("Username '%s' is already taken.", username)
+            raise ValueError("Username is already taken")
+        logger.info("User '%s' created successfully.", username)
+        return row[0]
     
     @staticmethod
     def delete_user(username):
@@ -59,17 +90,15 @@ class UserModel:
         if not username:
             raise Exception(f"Invalid input: username is required")
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM users WHERE username = ?', (username,))
-            conn.commit()
-            conn.close()
-            logger.info(f"User '{username}' deleted successfully.")
+            with get_db_connection() as conn:
+                conn.execute('DELETE FROM users WHERE username = ?', (username,))
+                conn.commit()
+            logger.info("User '%s' deleted successfully.", username)
         except sqlite3.Error as e:
-            logger.error(f"SQLite error deleting user '{username}': {e}")
+            logger.error("SQLite error deleting user '%s': %s", username, e)
             raise sqlite3.Error(f"Error deleting user: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error deleting user '{username}': {e}")
+            logger.error("Unexpected error deleting user '%s': %s", username, e)
             raise Exception(f"Unexpected error: {str(e)}")
 
     @staticmethod
@@ -87,20 +116,17 @@ class UserModel:
             sqlite3.Error: For general database errors.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, salt, password_hash FROM users WHERE id = ?', (user_id,))
-            user_data = cursor.fetchone()
-            conn.close()
+            with get_db_connection() as conn:
+                user_data = conn.execute('SELECT id, username, password_hash FROM users WHERE id = ?', (user_id,)).fetchone()
 
             if user_data:
                 return User(*user_data)
             return None
         except sqlite3.Error as e:
-            logger.error(f"SQLite error retrieving user by ID '{user_id}': {e}")
+            logger.error("SQLite error retrieving user by ID '%s': %s", user_id, e)
             raise sqlite3.Error(f"Error retrieving user by ID: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error retrieving user by ID '{user_id}': {e}")
+            logger.error("Unexpected error retrieving user by ID '%s': %s", user_id, e)
             raise Exception(f"Unexpected error: {str(e)}")
 
     @staticmethod
@@ -118,20 +144,19 @@ class UserModel:
             sqlite3.Error: For general database errors.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, salt, password_hash FROM users WHERE username = ?', (username,))
-            user_data = cursor.fetchone()
-            conn.close()
+            with get_db_connection() as conn:
+                user_data = conn.execute(
+                    'SELECT id, username, password_hash FROM users WHERE username = ?', (username,)
+                ).fetchone()
 
             if user_data:
                 return User(*user_data)
             return None
         except sqlite3.Error as e:
-            logger.error(f"SQLite error retrieving user by username '{username}': {e}")
+            logger.error("SQLite error retrieving user by username '%s': %s", username, e)
             raise sqlite3.Error(f"Error retrieving user by username: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error retrieving user by username '{username}': {e}")
+            logger.error("Unexpected error retrieving user by username '%s': %s", username, e)
             raise Exception(f"Unexpected error: {str(e)}")
 
     @staticmethod
@@ -140,23 +165,21 @@ class UserModel:
         Retrieves all users from the database.
 
         Returns:
-            List[User]: A list of User objects.
+            List[dict]: A list of users, each with its id and username.
 
         Raises:
             sqlite3.Error: For general database errors.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, username, salt, password_hash FROM users')
-            users_data = cursor.fetchall()
-            conn.close()
-            return [User(*user_data).to_dict() for user_data in users_data]
+            with get_db_connection() as conn:
+                # Only the public columns are returned, so don't read the password hash
+                users_data = conn.execute('SELECT id, username FROM users').fetchall()
+            return [{'id': user_id, 'username': username} for user_id, username in users_data]
         except sqlite3.Error as e:
-            logger.error(f"SQLite error retrieving all users: {e}")
+            logger.error("SQLite error retrieving all users: %s", e)
             raise sqlite3.Error(f"Error retrieving all users: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error retrieving all users: {e}")
+            logger.error("Unexpected error retrieving all users: %s", e)
             raise Exception(f"Unexpected error: {str(e)}")
 
     @staticmethod
@@ -172,23 +195,20 @@ class UserModel:
             sqlite3.Error: For general database errors.
         """
         try:
-            salt = bcrypt.gensalt()
-            password_hash = bcrypt.hashpw(new_password.encode('utf-8'), salt)
-
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'UPDATE users SET salt = ?, password_hash = ? WHERE username = ?',
-                (salt.decode(), password_hash.decode(), username)
-            )
-            conn.commit()
-            conn.close()
-            logger.info(f"Password for user '{username}' updated successfully.")
+            password_hash = _hash_password(new_password)
+
+            with get_db_connection() as conn:
+                conn.execute(
+                    'UPDATE users SET password_hash = ? WHERE username = ?',
+                    (password_hash, username)
+                )
+                conn.commit()
+            logger.info("Password for user '%s' updated successfully.", username)
         except sqlite3.Error as e:
-            logger.error(f"SQLite error updating password for user '{username}': {e}")
+            logger.error("SQLite error updating password for user '%s': %s", username, e)
             raise sqlite3.Error(f"Error updating password: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error updating password for user '{username}': {e}")
+            logger.error("Unexpected error updating password for user '%s': %s", username, e)
             raise Exception(f"Unexpected error: {str(e)}")
     
     @staticmethod
@@ -207,22 +227,32 @@ class UserModel:
             sqlite3.Error: For general database errors.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
-            user = cursor.fetchone()
-            conn.close()
-
-            if user:
-                password_hash = user[1]
-                if bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
-                    return True
-            return False
+            with get_db_connection() as conn:
+                # bcrypt reads the salt back out of the stored hash, so the hash is the only column needed
+                user = conn.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()
+
+            if not user:
+                _check_password(password, _DUMMY_HASH)
+                return False
+            password_hash = user[0]
+
+            if not _check_password(password, password_hash):
+                return False
+
+            # Hashes made under a different BCRYPT_COST are upgraded while the plaintext is at hand.
+            # The cost is the two digits after the "$2b$" prefix.
+            if int(password_hash[4:6]) != BCRYPT_COST:
+                try:
+                    UserModel.update_password(username, password)
+                    logger.info("Rehashed password for user '%s' at cost %s.", username, BCRYPT_COST)
+                except Exception as e:
+                    logger.warning("Could not rehash password for user '%s': %s", username, e)
+            return True
         except sqlite3.Error as e:
-            logger.error(f"SQLite error authenticating user '{username}': {e}")
+            logger.error("SQLite error authenticating user '%s': %s", username, e)
             raise sqlite3.Error(f"Error authenticating user: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error authenticating user '{username}': {e}")
+            logger.error("Unexpected error authenticating user '%s': %s", username, e)
             raise Exception(f"Unexpected error: {str(e)}")
     
     @staticmethod
@@ -243,10 +273,10 @@ class UserModel:
             user = UserModel.get_user_by_username(username)
             return user is not None
         except sqlite3.Error as e:
-            logger.error(f"SQLite error checking if username '{username}' is taken: {e}")
+            logger.error("SQLite error checking if username '%s' is taken: %s", username, e)
             raise sqlite3.Error(f"Error checking username availability: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error checking username '{username}': {e}")
+            logger.error("Unexpected error checking username '%s': %s", username, e)
             raise Exception(f"Unexpected error: {str(e)}")
 
     @staticmethod
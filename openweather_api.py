@@ -1,15 +1,68 @@
 # All calls to OpenWeatherAPI are made here
 
 import os
+import orjson
+import re
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+from utils.cache import ttl_cached
 from utils.logger import setup_logger
 
 load_dotenv()
 API_KEY = os.getenv('OPENWEATHER_API_KEY')
 logger = setup_logger()
 
+if not API_KEY:
+    logger.warning("OPENWEATHER_API_KEY is not set; OpenWeather requests will fail.")
+
+# OpenWeather endpoints, built once instead of per call
+BASE_URL = "https://api.openweathermap.org"
+GEO_URL = f"{BASE_URL}/geo/1.0/direct"
+FORECAST_URL = f"{BASE_URL}/data/2.5/forecast"
+AIR_POLLUTION_FORECAST_URL = f"{BASE_URL}/data/2.5/air_pollution/forecast"
+CURRENT_WEATHER_URL = f"{BASE_URL}/data/2.5/weather"
+AIR_POLLUTION_URL = f"{BASE_URL}/data/2.5/air_pollution"
+
+# (connect, read) timeout in seconds for every OpenWeather call
+REQUEST_TIMEOUT = (1.0, 3.0)
+
+# Shared session so calls reuse pooled keep-alive TCP/TLS connections instead of reconnecting each time
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=Retry(total=2, backoff_factor=0.1))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# City coordinates are effectively static; weather data only refreshes every few minutes upstream
+_coords_cache = TTLCache(maxsize=4096, ttl=86400)
+_forecast_cache = TTLCache(maxsize=1024, ttl=300)
+_current_weather_cache = TTLCache(maxsize=1024, ttl=300)
+_air_pollution_forecast_cache = TTLCache(maxsize=1024, ttl=300)
+_air_pollution_cache = TTLCache(maxsize=1024, ttl=300)
+
+# Last good weather responses, served for up to an hour while OpenWeather is failing or unreachable
+_stale_forecast_cache = TTLCache(maxsize=1024, ttl=3600)
+_stale_current_weather_cache = TTLCache(maxsize=1024, ttl=3600)
+_stale_air_pollution_forecast_cache = TTLCache(maxsize=1024, ttl=3600)
+_stale_air_pollution_cache = TTLCache(maxsize=1024, ttl=3600)
+
+_WHITESPACE = re.compile(r'\s+')
+
+# "New  York", "new york " and "NEW YORK" are the same lookup, so they share one cache entry
+def _coords_key(city: str, country_code: str = None):
+    return (_WHITESPACE.sub(' ', city.strip()).casefold(), (country_code or '').strip().casefold())
+
+# Coordinates are rounded to ~1 km so nearby lookups share an entry
+def _location_key(lat: float, lon: float, units: str = "imperial"):
+    return (round(lat, 2), round(lon, 2), units)
+
+def _air_pollution_key(lat: float, lon: float):
+    return (round(lat, 2), round(lon, 2))
+
 # Function to get coordinates (lat, lon) by city name
+@ttl_cached(_coords_cache, key=_coords_key)
 def get_coords(city: str, country_code: str = None):
     """
     Fetches the coordinates (latitude, longitude) of a city.
@@ -21,28 +74,27 @@ def get_coords(city: str, country_code: str = None):
     Returns:
         dict: A dictionary containing the latitude and longitude of the city.
     """
-    url = f"http://api.openweathermap.org/geo/1.0/direct?q={city}"
-    
-    if country_code:
-        url += f",{country_code}"
-    
-    url += f"&appid={API_KEY}"
+    # Passed as params so requests URL-encodes the city (e.g. names containing '&')
+    params = {
+        "q": f"{city},{country_code}" if country_code else city,
+        "appid": API_KEY
+    }
 
-    response = requests.get(url)
-    
     try:
-        response = requests.get(url)
-        data = response.json()
+        response = SESSION.get(GEO_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
         if data:
-            logger.info(f"Found coordinates: {data[0]['lat']}, {data[0]['lon']}")
+            logger.info("Found coordinates: %s, %s", data[0]['lat'], data[0]['lon'])
             return data[0]
         else:
-            logger.warning(f"No data found for {city}.")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed: {e}")
+            logger.warning("No data found for %s.", city)
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        logger.error("Request failed: %s", e)
     return None
 
 # Function to get weather forecast
+@ttl_cached(_forecast_cache, key=_location_key, stale=_stale_forecast_cache)
 def get_forecast(lat: float, lon: float, units: str = "imperial"):
     """
     Fetches weather forecast.
@@ -55,7 +107,6 @@ def get_forecast(lat: float, lon: float, units: str = "imperial"):
     Returns:
         dict: A dictionary containing forecast data.
     """
-    url = f"http://api.openweathermap.org/data/2.5/forecast"
     params = {
         "lat": lat,
         "lon": lon,
@@ -64,15 +115,17 @@ def get_forecast(lat: float, lon: float, units: str = "imperial"):
     }
     
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        logger.info(f"Forecast data retrieved for lat={lat}, lon={lon}")
+        response = SESSION.get(FORECAST_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        logger.info("Forecast data retrieved for lat=%s, lon=%s", lat, lon)
         return data
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching forecast: {e}")
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        logger.error("Error fetching forecast: %s", e)
         return None
 
 # Function to get air pollution forecast data
+@ttl_cached(_air_pollution_forecast_cache, key=_air_pollution_key, stale=_stale_air_pollution_forecast_cache)
 def get_air_pollution_forecast(lat: float, lon: float):
     """
     Fetches air pollution forecast data for a location.
@@ -84,7 +137,6 @@ def get_air_pollution_forecast(lat: float, lon: float):
     Returns:
         dict: A dictionary containing air pollution forecast data.
     """
-    url = f"http://api.openweathermap.org/data/2.5/air_pollution/forecast"
     params = {
         "lat": lat,
         "lon": lon,
@@ -92,15 +144,17 @@ def get_air_pollution_forecast(lat: float, lon: float):
     }
 
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        logger.info(f"Air pollution forecast data retrieved for lat={lat}, lon={lon}")
+        response = SESSION.get(AIR_POLLUTION_FORECAST_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        logger.info("Air pollution forecast data retrieved for lat=%s, lon=%s", lat, lon)
         return data
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching air pollution forecast data: {e}")
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        logger.error("Error fetching air pollution forecast data: %s", e)
         return None
 
 # Function to get current weather
+@ttl_cached(_current_weather_cache, key=_location_key, stale=_stale_current_weather_cache)
 def get_current_weather(lat: float, lon: float, units: str = "imperial"):
     """
     Fetches current weather.
@@ -113,7 +167,6 @@ def get_current_weather(lat: float, lon: float, units: str = "imperial"):
     Returns:
         dict: A dictionary containing current weather data.
     """
-    url = f"http://api.openweathermap.org/data/2.5/weather"
     params = {
         "lat": lat,
         "lon": lon,
@@ -122,15 +175,17 @@ def get_current_weather(lat: float, lon: float, units: str = "imperial"):
     }
     
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        logger.info(f"Current weather data retrieved for lat={lat}, lon={lon}")
+        response = SESSION.get(CURRENT_WEATHER_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        logger.info("Current weather data retrieved for lat=%s, lon=%s", lat, lon)
         return data
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching current weather: {e}")
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        logger.error("Error fetching current weather: %s", e)
         return None
 
 # Function to get air pollution
+@ttl_cached(_air_pollution_cache, key=_air_pollution_key, stale=_stale_air_pollution_cache)
 def get_air_pollution(lat: float, lon: float):
     """
     Fetches air pollution data for a location.
@@ -142,7 +197,6 @@ def get_air_pollution(lat: float, lon: float):
     Returns:
         dict: A dictionary containing air pollution data.
     """
-    url = f"http://api.openweathermap.org/data/2.5/air_pollution"
     params = {
         "lat": lat,
         "lon": lon,
@@ -150,10 +204,11 @@ def get_air_pollution(lat: float, lon: float):
     }
     
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        logger.info(f"Air pollution data retrieved for lat={lat}, lon={lon}")
+        response = SESSION.get(AIR_POLLUTION_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        logger.info("Air pollution data retrieved for lat=%s, lon=%s", lat, lon)
         return data
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching air pollution data: {e}")
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        logger.error("Error fetching air pollution data: %s", e)
         return None
\ No newline at end of file
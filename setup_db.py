@@ -1,13 +1,20 @@
 import sqlite3
+from models.FavoriteModel import _normalize_location
 from utils.logger import setup_logger
+from utils.sql import DB_PATH
 
 def setup_database():
-    # Set up the SQLite database with the necessary tables and foreign key constraints.
+    # Set up the SQLite database with the necessary tables, indexes and foreign key constraints.
+    # Run once at startup, before the app's connection pool opens any connections.
+    conn = None
     try:
         # Connect to SQLite database
-        conn = sqlite3.connect('db/weather.db')
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
+        # WAL lets readers and a writer work concurrently; the mode is persistent in the database file
+        cursor.execute('PRAGMA journal_mode = WAL;')
+
         # Enable foreign key support
         cursor.execute('PRAGMA foreign_keys = ON;')
 
@@ -16,11 +23,15 @@ def setup_database():
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT UNIQUE NOT NULL,
-                salt TEXT NOT NULL,
-                password_hash TEXT NOT NULL
+                password_hash BLOB NOT NULL
             )
         ''')
 
+        # The salt is embedded in the bcrypt hash; drop the redundant column from databases created before that
+        user_columns = [row[1] for row in cursor.execute('PRAGMA table_info(users);')]
+        if 'salt' in user_columns:
+            cursor.execute('ALTER TABLE users DROP COLUMN salt;')
+
         # Create the favorites table with a foreign key referencing users
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS favorites (
@@ -33,12 +44,55 @@ def setup_database():
             )
         ''')
 
+        # Drop duplicate favorites left by older versions so the unique index can be built
+        cursor.execute('''
+            DELETE FROM favorites WHERE id NOT IN (
+                SELECT MIN(id) FROM favorites GROUP BY user_id, location
+            )
+        ''')
+
+        # Index favorites lookups and enforce one row per (user, location)
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_favorites_user_location
+            ON favorites (user_id, location)
+        ''')
+
+        # The app trims and collapses whitespace in locations before storing and looking them up; normalize
+        # older rows the same way, dropping any that then duplicate an existing favorite or are left blank
+        conn.create_function('normalize_location', 1, _normalize_location, deterministic=True)
+        cursor.execute('''
+            UPDATE OR IGNORE favorites SET location = normalize_location(location)
+            WHERE location != normalize_location(location)
+        ''')
+        cursor.execute("DELETE FROM favorites WHERE location != normalize_location(location) OR location = ''")
+
+        # Per-user counter bumped on every favorites change, used as the /api/get-favorites ETag.
+        # Triggers keep it in the same transaction as the change itself.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS favorites_version (
+                user_id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS favorites_version_{event.lower()}
+                AFTER {event} ON favorites
+                BEGIN
+                    INSERT INTO favorites_version (user_id, version) VALUES ({row}.user_id, 1)
+                    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+                END
+            ''')
+
         conn.commit()
+
+        # Refresh query planner statistics for the indexes above; the app repeats this periodically
+        cursor.execute('PRAGMA optimize;')
         logger.info("Database setup complete")
         print("Database setup complete!")
 
     except sqlite3.Error as e:
-        logger.error(f"An error occurred while setting up the database: {e}")
+        logger.error("An error occurred while setting up the database: %s", e)
         print(f"An error occurred while setting up the database: {e}")
     finally:
         # Ensure the connection is closed
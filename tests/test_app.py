@@ -0,0 +1,118 @@
+import pytest
+import app as app_module
+from app import app, etag_matches, json_fields
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+@pytest.fixture
+def mock_favorites(mocker):
+    # Patch the favorites model so the routes never touch the database
+    mocker.patch.object(app_module.FavoriteModel, "get_favorites_version", return_value=3)
+    return mocker.patch.object(
+        app_module.FavoriteModel, "get_favorites_json", return_value='[{"id":1,"location":"New York"}]'
+    )
+
+# Get favorites paging
+
+@pytest.mark.parametrize("query", [
+    "limit=-1",
+    "limit=abc",
+    "offset=1.5",
+    "limit=²",
+    "limit=99999999999999999999",
+    "offset=9223372036854775808",
+])
+def test_get_favorites_rejects_bad_paging(client, mock_favorites, query):
+    """Test that limit/offset values int() or SQLite can't take get a 400 instead of reaching the query."""
+    response = client.get(f"/api/get-favorites?user_id=1&{query}")
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'limit and offset must be non-negative integers'}
+    mock_favorites.assert_not_called()
+
+def test_get_favorites_accepts_paging(client, mock_favorites):
+    """Test that valid limit/offset values are passed to the model as integers."""
+    response = client.get("/api/get-favorites?user_id=1&limit=9223372036854775807&offset=2")
+
+    assert response.status_code == 200
+    mock_favorites.assert_called_once_with('1', 9223372036854775807, 2, 3)
+
+# Get favorites ETag
+
+def test_get_favorites_etag_and_304(client, mock_favorites):
+    """Test that the list carries a weak version-based ETag and a matching If-None-Match gets a 304 with it."""
+    response = client.get("/api/get-favorites?user_id=1")
+    assert response.status_code == 200
+    assert response.headers['ETag'] == 'W/"1-3-None-0"'
+    assert response.get_json() == {'favorites': [{'id': 1, 'location': 'New York'}]}
+
+    response = client.get("/api/get-favorites?user_id=1", headers={'If-None-Match': 'W/"1-3-None-0"'})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == 'W/"1-3-None-0"'
+    assert response.data == b''
+    # The body isn't built for a 304
+    mock_favorites.assert_called_once()
+
+def test_get_favorites_stale_etag(client, mock_favorites):
+    """Test that an ETag from an older favorites version gets the full list again."""
+    response = client.get("/api/get-favorites?user_id=1", headers={'If-None-Match': 'W/"1-2-None-0"'})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == 'W/"1-3-None-0"'
+
+# Weather ETags
+
+@pytest.mark.parametrize("encoding", ["zstd", "gzip"])
+def test_cacheable_json_304_for_compressed_etag(client, mocker, encoding):
+    """Test that the ETag Flask-Compress suffixes with the encoding still validates to a 304."""
+    mocker.patch.object(app_module, "get_coords", return_value={'lat': 40.7, 'lon': -74.0, 'name': 'New York' * 100})
+
+    response = client.get("/api/coords?city=New York", headers={'Accept-Encoding': encoding})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == encoding
+    etag = response.headers['ETag']
+    assert etag.endswith(f':{encoding}"')
+    assert response.headers['Cache-Control'] == f'public, max-age={app_module.COORDS_MAX_AGE}'
+
+    response = client.get("/api/coords?city=New York", headers={'Accept-Encoding': encoding, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_etag_matches():
+    """Test matching If-None-Match values with and without a compression suffix."""
+    with app.test_request_context(headers={'If-None-Match': '"abc:zstd", W/"def"'}):
+        assert etag_matches('abc')
+        assert etag_matches('def')
+        assert not etag_matches('abc:zstd')
+        assert not etag_matches('xyz')
+
+    with app.test_request_context():
+        assert not etag_matches('abc')
+
+# JSON bodies
+
+@pytest.mark.parametrize("data, content_type", [
+    ('{"username": "a"', 'application/json'),
+    ('["a", "b"]', 'application/json'),
+    ('"a"', 'application/json'),
+    ('', 'application/json'),
+    ('{"username": "a", "password": "b"}', 'text/plain'),
+])
+def test_json_fields_unusable_body(data, content_type):
+    """Test that malformed, non-object or non-JSON bodies yield None for every field."""
+    with app.test_request_context(method='POST', data=data, content_type=content_type):
+        assert json_fields('username', 'password') == [None, None]
+
+def test_json_fields_object_body():
+    """Test that fields are read from a JSON object body, with None for absent ones."""
+    with app.test_request_context(method='POST', json={'username': 'a', 'extra': 1}):
+        assert json_fields('username', 'password') == ['a', None]
+
+def test_malformed_body_gets_400(client):
+    """Test that a route answers a malformed body with its missing-input 400."""
+    response = client.post("/create-account", data='{"username": ', content_type='application/json')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Username and password are required'}
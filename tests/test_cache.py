@@ -0,0 +1,62 @@
+from unittest.mock import MagicMock
+from cachetools import TTLCache
+from utils.cache import ttl_cached
+
+class FakeTimer:
+    # Lets the tests move TTLCache's clock forward instead of sleeping
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+def make_cached(func, cache, stale=None):
+    return ttl_cached(cache, key=lambda city: city.lower(), stale=stale)(func)
+
+def test_ttl_cached_hit():
+    """Test that a repeat call with an equivalent key is served from the cache."""
+    func = MagicMock(return_value={'lat': 1.0})
+    cached = make_cached(func, TTLCache(maxsize=10, ttl=60))
+
+    assert cached("Boston") == {'lat': 1.0}
+    assert cached("boston") == {'lat': 1.0}
+    func.assert_called_once_with("Boston")
+
+def test_ttl_cached_falsy_not_cached():
+    """Test that a falsy result is returned but not cached, so the next call retries."""
+    func = MagicMock(side_effect=[None, {'lat': 1.0}])
+    cache = TTLCache(maxsize=10, ttl=60)
+    cached = make_cached(func, cache)
+
+    assert cached("Boston") is None
+    assert "boston" not in cache
+    assert cached("Boston") == {'lat': 1.0}
+    assert func.call_count == 2
+
+def test_ttl_cached_stale_after_expiry():
+    """Test that the stale copy is returned when a call fails after the fresh entry expired."""
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    func = MagicMock(side_effect=[{'temp': 20}, None])
+    cached = make_cached(func, cache, stale=TTLCache(maxsize=10, ttl=3600, timer=timer))
+
+    assert cached("Boston") == {'temp': 20}
+    timer.now = 61
+    assert cached("Boston") == {'temp': 20}
+    assert func.call_count == 2
+
+def test_ttl_cached_stale_not_written_back():
+    """Test that a stale result isn't put back in the fresh cache, so later calls keep retrying."""
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    func = MagicMock(side_effect=[{'temp': 20}, None, {'temp': 25}])
+    cached = make_cached(func, cache, stale=TTLCache(maxsize=10, ttl=3600, timer=timer))
+
+    cached("Boston")
+    timer.now = 61
+    assert cached("Boston") == {'temp': 20}
+    assert "boston" not in cache
+
+    # The next call goes back to the function and its fresh result replaces the stale one
+    assert cached("Boston") == {'temp': 25}
+    assert func.call_count == 3
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import MagicMock
+from models import FavoriteModel as favorite_model_module
 from models.FavoriteModel import FavoriteModel
 from models.UserModel import UserModel
 
@@ -15,10 +16,20 @@ def mock_cursor(mocker):
     mock_cursor.fetchall.return_value = []
     mock_conn.commit.return_value = None
     mock_conn.close.return_value = None
+    mock_conn.__enter__.return_value = mock_conn
+
+    # The models run statements through conn.execute(), which returns the cursor it used
+    mock_conn.execute = mock_cursor.execute
+    mock_conn.executemany = mock_cursor.executemany
+    mock_cursor.execute.return_value = mock_cursor
+    mock_cursor.executemany.return_value = mock_cursor
 
     # Patch the `get_db_connection` to return the mock connection
     mocker.patch("models.FavoriteModel.get_db_connection", return_value=mock_conn)
 
+    # Start every test with an empty favorites cache
+    favorite_model_module._favorites_cache.clear()
+
     return mock_cursor  # Return the mock cursor for test assertions
 
 # Add, remove, update favorite
@@ -31,10 +42,45 @@ def test_add_favorite_success(mock_cursor):
     FavoriteModel.add_favorite(user_id, location)
 
     # Verify the insert SQL query was executed
-    if mock_cursor.execute.call_args:
-        executed_query, query_params = mock_cursor.execute.call_args[0]
-        assert executed_query == "INSERT INTO favorites (user_id, location) VALUES (?, ?)"
-        assert query_params == (user_id, location)
+    executed_query, query_params = mock_cursor.execute.call_args[0]
+    assert executed_query == "INSERT INTO favorites (user_id, location) VALUES (?, ?) ON CONFLICT (user_id, location) DO NOTHING"
+    assert query_params == (user_id, location)
+
+def test_add_favorite_normalizes_whitespace(mock_cursor):
+    """Test that surrounding and repeated whitespace is collapsed before storing a location."""
+    mock_cursor.rowcount = 1
+
+    FavoriteModel.add_favorite(1, "  New   York\n")
+
+    assert mock_cursor.execute.call_args[0][1] == (1, "New York")
+
+def test_add_favorite_blank(mock_cursor):
+    """Test that a whitespace-only location is rejected."""
+    with pytest.raises(ValueError, match="Location cannot be blank."):
+        FavoriteModel.add_favorite(1, "   ")
+    mock_cursor.execute.assert_not_called()
+
+def test_add_favorites_bulk(mock_cursor):
+    """Test adding several favorite locations in one batched insert."""
+    user_id = 1
+    mock_cursor.rowcount = 2
+
+    added = FavoriteModel.add_favorites_bulk(user_id, ["New York", " Paris "])
+
+    executed_query, query_params = mock_cursor.executemany.call_args[0]
+    assert executed_query == 'INSERT INTO favorites (user_id, location) VALUES (?, ?) ON CONFLICT (user_id, location) DO NOTHING'
+    assert query_params == [(user_id, "New York"), (user_id, "Paris")]
+    assert added == 2
+
+def test_add_favorite_duplicate(mock_cursor):
+    """Test adding a favorite location that already exists for the user."""
+    user_id = 9999
+    location = "New York"
+
+    # Simulate the insert being skipped by the unique index
+    mock_cursor.rowcount = 0
+    with pytest.raises(ValueError, match=f"'{location}' is already a favorite location for this user."):
+        FavoriteModel.add_favorite(user_id, location)
 
 def test_remove_favorite_success(mock_cursor):
     """Test removing an existing favorite location."""
@@ -48,7 +94,7 @@ def test_remove_favorite_success(mock_cursor):
 
     # Verify the delete SQL query was executed
     executed_query, query_params = mock_cursor.execute.call_args[0]
-    assert executed_query == "DELETE FROM favorites WHERE user_id = ? AND location = ?"
+    assert executed_query == "DELETE FROM favorites WHERE user_id = ? AND location = ? RETURNING id"
     assert query_params == (user_id, location)
 
 def test_remove_favorite_not_found(mock_cursor):
@@ -76,8 +122,8 @@ def test_update_favorite_success(mock_cursor):
     # Verify the update SQL query was executed
     executed_query, query_params = mock_cursor.execute.call_args_list[-1][0]
     expected_query = '''
-            UPDATE favorites SET location = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE user_id = ? AND location = ?
+                    UPDATE favorites SET location = ?, updated_at = CURRENT_TIMESTAMP 
+                    WHERE user_id = ? AND location = ?
     '''.strip()
     assert executed_query.strip() == expected_query
     assert query_params == (new_location, user_id, old_location)
@@ -87,14 +133,29 @@ def test_update_favorite_success(mock_cursor):
 def test_clear_favorites(mock_cursor):
     """Test clearing all favorite locations for a user."""
     user_id = 9999
+    mock_cursor.rowcount = 3
 
     # Call the function to clear all favorites
-    FavoriteModel.clear_favorites(user_id)
+    removed = FavoriteModel.clear_favorites(user_id)
 
     # Verify the delete SQL query was executed
     executed_query, query_params = mock_cursor.execute.call_args[0]
     assert executed_query == "DELETE FROM favorites WHERE user_id = ?"
     assert query_params == (user_id,)
+    assert removed == 3
+
+def test_clear_favorites_selected_locations(mock_cursor):
+    """Test clearing only the given favorite locations for a user."""
+    user_id = 9999
+    locations = ["New York", "Paris"]
+
+    FavoriteModel.clear_favorites(user_id, locations)
+
+    # Verify the batched delete was executed once for all locations
+    executed_query, query_params = mock_cursor.executemany.call_args[0]
+    assert executed_query == "DELETE FROM favorites WHERE user_id = ? AND location = ?"
+    assert query_params == [(user_id, "New York"), (user_id, "Paris")]
+    mock_cursor.execute.assert_not_called()
 
 # Get favorites
 
@@ -121,4 +182,35 @@ def test_get_favorites_no_data(mock_cursor):
     mock_cursor.fetchall.return_value = []
     
     result = FavoriteModel.get_favorites(user_id)
-    assert result == [], f"Expected [], but got {result}"
\ No newline at end of file
+    assert result == [], f"Expected [], but got {result}"
+
+def test_get_favorites_version(mock_cursor):
+    """Test reading a user's favorites version, defaulting to 0 when it has never changed."""
+    mock_cursor.fetchone.return_value = (4,)
+    assert FavoriteModel.get_favorites_version(1) == 4
+    mock_cursor.execute.assert_called_with('SELECT version FROM favorites_version WHERE user_id = ?', (1,))
+
+    mock_cursor.fetchone.return_value = None
+    assert FavoriteModel.get_favorites_version(2) == 0
+
+def test_get_favorites_json(mock_cursor):
+    """Test that the favorites list is returned as the JSON text SQLite builds."""
+    mock_cursor.fetchone.return_value = ('[{"id":1,"location":"New York"}]',)
+
+    result = FavoriteModel.get_favorites_json(4, limit=10, offset=0)
+    assert result == '[{"id":1,"location":"New York"}]'
+    assert mock_cursor.execute.call_args[0][1] == (4, 10, 0)
+
+def test_get_favorites_json_cached_per_version(mock_cursor):
+    """Test that the cached full list is only reused while the favorites version is unchanged."""
+    mock_cursor.fetchone.return_value = ('[{"id":1,"location":"New York"}]',)
+
+    FavoriteModel.get_favorites_json(5, version=1)
+    FavoriteModel.get_favorites_json(5, version=1)
+    assert mock_cursor.execute.call_count == 1
+
+    # A write from another process bumps the version without clearing this cache
+    mock_cursor.fetchone.return_value = ('[{"id":1,"location":"New York"},{"id":2,"location":"Paris"}]',)
+    result = FavoriteModel.get_favorites_json(5, version=2)
+    assert mock_cursor.execute.call_count == 2
+    assert result == '[{"id":1,"location":"New York"},{"id":2,"location":"Paris"}]'
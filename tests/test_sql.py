@@ -0,0 +1,83 @@
+import queue
+import threading
+import pytest
+from utils import sql
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    # Give every test a small, empty pool over its own database file
+    monkeypatch.setattr(sql, "DB_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setattr(sql, "POOL_SIZE", 2)
+    monkeypatch.setattr(sql, "_pool", queue.LifoQueue(maxsize=2))
+    monkeypatch.setattr(sql, "_connections_created", 0)
+    yield sql
+
+    while not sql._pool.empty():
+        sql._pool.get_nowait().close()
+
+def test_pool_stats_empty(pool):
+    """Test that no connections are opened until one is borrowed."""
+    assert pool.pool_stats() == {'size': 2, 'open': 0, 'idle': 0}
+
+def test_idle_connection_reused(pool):
+    """Test that a returned connection is handed out again instead of opening a new one."""
+    with pool.get_db_connection() as first:
+        assert pool.pool_stats() == {'size': 2, 'open': 1, 'idle': 0}
+
+    with pool.get_db_connection() as second:
+        assert second is first
+
+    assert pool.pool_stats() == {'size': 2, 'open': 1, 'idle': 1}
+
+def test_open_connections_capped(pool):
+    """Test that connections are opened lazily up to POOL_SIZE and all return to the pool."""
+    with pool.get_db_connection() as first, pool.get_db_connection() as second:
+        assert first is not second
+        assert pool.pool_stats() == {'size': 2, 'open': 2, 'idle': 0}
+
+    assert pool.pool_stats() == {'size': 2, 'open': 2, 'idle': 2}
+
+def test_exhausted_pool_blocks_until_returned(pool):
+    """Test that a borrower waits once POOL_SIZE connections are out and gets a returned one."""
+    acquired = threading.Event()
+    borrowed = []
+
+    def borrow():
+        with pool.get_db_connection() as conn:
+            borrowed.append(conn)
+            acquired.set()
+
+    with pool.get_db_connection() as first, pool.get_db_connection() as second:
+        waiter = threading.Thread(target=borrow)
+        waiter.start()
+        assert not acquired.wait(0.2)
+        assert pool.pool_stats()['open'] == 2
+
+    waiter.join(timeout=5)
+    assert acquired.is_set()
+    assert borrowed[0] in (first, second)
+    assert pool.pool_stats() == {'size': 2, 'open': 2, 'idle': 2}
+
+def test_rollback_when_body_raises(pool):
+    """Test that an error inside the block rolls back its writes and still returns the connection."""
+    with pool.get_db_connection() as conn:
+        conn.execute('CREATE TABLE items (name TEXT)')
+
+    with pytest.raises(RuntimeError):
+        with pool.get_db_connection() as conn:
+            conn.execute("INSERT INTO items VALUES ('a')")
+            raise RuntimeError("boom")
+
+    with pool.get_db_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+    assert pool.pool_stats() == {'size': 2, 'open': 1, 'idle': 1}
+
+def test_commit_on_success(pool):
+    """Test that writes are committed when the block exits normally."""
+    with pool.get_db_connection() as conn:
+        conn.execute('CREATE TABLE items (name TEXT)')
+        conn.execute("INSERT INTO items VALUES ('a')")
+
+    # The second connection is newly opened, so it only sees what was committed
+    with pool.get_db_connection(), pool.get_db_connection() as other:
+        assert other.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 1
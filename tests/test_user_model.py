@@ -2,6 +2,7 @@ import pytest
 import bcrypt
 import sqlite3
 from unittest.mock import MagicMock
+from models import UserModel as user_model_module
 from models.User import User
 from models.UserModel import UserModel
 
@@ -17,6 +18,13 @@ def mock_cursor(mocker):
     mock_cursor.fetchall.return_value = []
     mock_conn.commit.return_value = None
     mock_conn.close.return_value = None
+    mock_conn.__enter__.return_value = mock_conn
+
+    # The models run statements through conn.execute(), which returns the cursor it used
+    mock_conn.execute = mock_cursor.execute
+    mock_conn.executemany = mock_cursor.executemany
+    mock_cursor.execute.return_value = mock_cursor
+    mock_cursor.executemany.return_value = mock_cursor
 
     # Patch the `get_db_connection` to return the mock connection
     mocker.patch("models.UserModel.get_db_connection", return_value=mock_conn)
@@ -27,7 +35,7 @@ def mock_cursor(mocker):
 
 def test_user_to_dict():
     """Test the to_dict method of the User class."""
-    user = User(id=1, username="test_user", password_hash="hashed_password", salt="salt")
+    user = User(id=1, username="test_user", password_hash="hashed_password")
     
     # Expected dictionary representation
     expected_dict = {
@@ -45,14 +53,26 @@ def test_create_user_success(mock_cursor):
     username = "test_user"
     password = "password123"
 
+    # Simulate the inserted row's id being returned
+    mock_cursor.fetchone.return_value = (7,)
+
     # Call the function
-    UserModel.create_user(username, password)
+    user_id = UserModel.create_user(username, password)
 
     # Verify SQL execution
     executed_query, query_params = mock_cursor.execute.call_args[0]
-    assert executed_query == "INSERT INTO users (username, salt, password_hash) VALUES (?, ?, ?)"
+    assert executed_query == "INSERT INTO users (username, password_hash) VALUES (?, ?) ON CONFLICT (username) DO NOTHING RETURNING id"
     assert query_params[0] == username
-    assert bcrypt.checkpw(password.encode('utf-8'), query_params[2].encode('utf-8'))
+    assert bcrypt.checkpw(password.encode('utf-8'), query_params[1])
+    assert user_id == 7
+
+def test_create_user_username_taken(mock_cursor):
+    """Test that a taken username inserts nothing and is reported as a ValueError."""
+    # The conflicting insert returns no row
+    mock_cursor.fetchone.return_value = None
+
+    with pytest.raises(ValueError, match="Username is already taken"):
+        UserModel.create_user("existing_user", "password123")
 
 def test_create_user_duplicate_username(mock_cursor):
     """Test handling of duplicate username."""
@@ -170,10 +190,10 @@ def test_delete_user_unexpected_error(mock_cursor):
 def test_get_user_by_id_success(mock_cursor):
     """Test getting a user by ID successfully."""
     user_id = 1
-    expected_user = User(id=user_id, username="test_user", password_hash="hashed_password", salt="salt")
+    expected_user = User(id=user_id, username="test_user", password_hash="hashed_password")
 
     # Simulate the return value of the cursor to match a user with this ID
-    mock_cursor.fetchone.return_value = (user_id, "test_user", "hashed_password", "salt")
+    mock_cursor.fetchone.return_value = (user_id, "test_user", "hashed_password")
     
     user = UserModel.get_user_by_id(user_id)
     
@@ -208,9 +228,9 @@ def test_get_user_by_id_unexpected_error(mock_cursor):
 def test_get_user_by_username_success(mock_cursor):
     """Test getting a user by username successfully."""
     username = "test_user"
-    expected_user = User(id=1, username=username, password_hash="hashed_password", salt ="salt")
+    expected_user = User(id=1, username=username, password_hash="hashed_password")
 
-    mock_cursor.fetchone.return_value = (1, username, "hashed_password", "salt")
+    mock_cursor.fetchone.return_value = (1, username, "hashed_password")
     user = UserModel.get_user_by_username(username)
     
     # Verify that the returned user is correct
@@ -247,11 +267,14 @@ def test_get_user_by_username_unexpected_error(mock_cursor):
 def test_get_all_users_success(mock_cursor):
     """Test getting all users successfully."""
     mock_cursor.fetchall.return_value = [
-        (1, "user1", "hashed_password1", "salt1"),
-        (2, "user2", "hashed_password2", "salt2")
+        (1, "user1"),
+        (2, "user2")
     ]
     
     users = UserModel.get_all_users()
+
+    executed_query = mock_cursor.execute.call_args[0][0]
+    assert executed_query == "SELECT id, username FROM users"
     
     # Verify that two users are returned
     assert len(users) == 2
@@ -287,16 +310,15 @@ def test_update_password_success(mock_cursor):
     UserModel.update_password(username, new_password)
     
     executed_query, query_params = mock_cursor.execute.call_args[0]
-    assert executed_query == 'UPDATE users SET salt = ?, password_hash = ? WHERE username = ?'
+    assert executed_query == 'UPDATE users SET password_hash = ? WHERE username = ?'
     
-    # Check if the salt and hashed password are generated and passed to the query
-    salt = query_params[0]
-    password_hash = query_params[1]
+    # Check if the hashed password is generated and passed to the query
+    password_hash = query_params[0]
     
-    # Ensure the password is hashed and salted
-    assert bcrypt.checkpw(new_password.encode('utf-8'), password_hash.encode('utf-8'))
+    # Ensure the password is hashed; bcrypt embeds the salt in the hash
+    assert bcrypt.checkpw(new_password.encode('utf-8'), password_hash)
     # Check that the username is passed correctly
-    assert query_params[2] == username
+    assert query_params[1] == username
 
 def test_update_password_db_error(mock_cursor):
     """Test handling of db errors during password update."""
@@ -324,10 +346,11 @@ def test_authenticate_user_success(mock_cursor):
     hashed_password = bcrypt.hashpw(correct_password.encode('utf-8'), bcrypt.gensalt()).decode()
     
     # Simulate the retrieval of a user with the correct password hash
-    mock_cursor.fetchone.return_value = (1, hashed_password)
+    mock_cursor.fetchone.return_value = (hashed_password,)
     
     result = UserModel.authenticate_user(username, correct_password)
     assert result is True
+    mock_cursor.execute.assert_called_once_with('SELECT password_hash FROM users WHERE username = ?', (username,))
 
 def test_authenticate_user_invalid_password(mock_cursor):
     """Test unsuccessful user authentication due to invalid password."""
@@ -336,20 +359,54 @@ def test_authenticate_user_invalid_password(mock_cursor):
     hashed_password = bcrypt.hashpw("correctpassword".encode('utf-8'), bcrypt.gensalt()).decode()
     
     # Simulate the retrieval of a user with the correct password hash
-    mock_cursor.fetchone.return_value = (1, hashed_password)
+    mock_cursor.fetchone.return_value = (hashed_password,)
 
     result = UserModel.authenticate_user(username, incorrect_password)
     assert result is False
 
-def test_authenticate_user_not_found(mock_cursor):
+def test_authenticate_user_bytes_hash(mock_cursor):
+    """Test authentication against a hash stored as bytes."""
+    hashed_password = bcrypt.hashpw("correctpassword".encode('utf-8'), bcrypt.gensalt())
+    mock_cursor.fetchone.return_value = (hashed_password,)
+
+    assert UserModel.authenticate_user("test_user", "correctpassword") is True
+
+def test_authenticate_user_rehashes_other_cost(mock_cursor, mocker):
+    """Test that a successful login upgrades a hash made with a different bcrypt cost."""
+    mocker.patch.object(user_model_module, "BCRYPT_COST", 4)
+    hashed_password = bcrypt.hashpw("correctpassword".encode('utf-8'), bcrypt.gensalt(rounds=5))
+    mock_cursor.fetchone.return_value = (hashed_password,)
+
+    assert UserModel.authenticate_user("test_user", "correctpassword") is True
+
+    executed_query, query_params = mock_cursor.execute.call_args[0]
+    assert executed_query == 'UPDATE users SET password_hash = ? WHERE username = ?'
+    assert query_params[0].startswith(b'$2b$04$')
+    assert bcrypt.checkpw("correctpassword".encode('utf-8'), query_params[0])
+
+def test_authenticate_user_not_found(mock_cursor, mocker):
     """Test that authentication fails if user is not found."""
     username = "nonexistent_user"
     
     # Simulate no user found
     mock_cursor.fetchone.return_value = None
     
+    # bcrypt still runs against the dummy hash so the response time doesn't reveal the user is missing
+    check_password = mocker.spy(user_model_module, "_check_password")
     result = UserModel.authenticate_user(username, "password123")
     assert result is False
+    check_password.assert_called_once_with("password123", user_model_module._DUMMY_HASH)
+
+def test_authenticate_user_reads_current_hash(mock_cursor):
+    """Test that every authentication checks the hash currently stored, so a changed password applies at once."""
+    username = "test_user"
+    mock_cursor.fetchone.return_value = (bcrypt.hashpw("correctpassword".encode('utf-8'), bcrypt.gensalt()).decode(),)
+    assert UserModel.authenticate_user(username, "correctpassword") is True
+
+    # The password was changed by another worker
+    mock_cursor.fetchone.return_value = (bcrypt.hashpw("newpassword1".encode('utf-8'), bcrypt.gensalt()).decode(),)
+    assert UserModel.authenticate_user(username, "correctpassword") is False
+    assert mock_cursor.execute.call_count == 2
 
 def test_authenticate_user_db_error(mock_cursor):
     """Test handling of db errors during user authentication."""
@@ -373,7 +430,7 @@ def test_is_username_taken_true(mock_cursor):
     """Test when the username is already taken."""
     username = "test_user"
     
-    mock_cursor.fetchone.return_value = (1, username, "hashed_password", "salt")
+    mock_cursor.fetchone.return_value = (1, username, "hashed_password")
     result = UserModel.is_username_taken(username)
     assert result is True
 
@@ -0,0 +1,49 @@
+import functools
+import threading
+
+_MISSING = object()
+
+def ttl_cached(cache, key, stale=None):
+    """
+    Decorator that memoizes a function's results in a cachetools cache.
+
+    Falsy results (None, empty responses) are not cached, so a failed call is retried
+    on the next request instead of being served until the entry expires.
+
+    Args:
+        cache (cachetools.Cache): The cache to store results in, e.g. a TTLCache.
+        key (callable): Builds the cache key from the wrapped function's arguments.
+        stale (cachetools.Cache, optional): A longer-lived copy of each result. When a call
+            fails after its entry in `cache` has expired, the last good result is returned
+            from here instead. Defaults to None (failures return the falsy result).
+
+    Returns:
+        callable: The decorator.
+    """
+    lock = threading.Lock()
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            with lock:
+                result = cache.get(cache_key, _MISSING)
+            if result is not _MISSING:
+                return result
+
+            result = func(*args, **kwargs)
+            if result:
+                with lock:
+                    cache[cache_key] = result
+                    if stale is not None:
+                        stale[cache_key] = result
+            elif stale is not None:
+                # Not written back to `cache`, so the next request tries the call again
+                with lock:
+                    result = stale.get(cache_key, result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -0,0 +1,39 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson, used for request.get_json() and jsonify().
+
+    Types orjson can't serialize natively fall back to Flask's default handler.
+    """
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize data as JSON with orjson.
+
+        Args:
+            obj: The data to serialize.
+            **kwargs: Flask's dump options; sort_keys and indent are honored.
+
+        Returns:
+            str: The JSON string.
+        """
+        # Like the stdlib encoder, accept int/float/etc. dict keys by writing them as strings
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize data as JSON with orjson.
+
+        Args:
+            s (str | bytes): Text or UTF-8 bytes.
+
+        Returns:
+            The deserialized data.
+        """
+        return orjson.loads(s)
@@ -1,20 +1,44 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+from dotenv import load_dotenv
+
+# Background thread that writes queued log records to app.log
+_listener = None
 
 def setup_logger():
     """
     Sets up the logger configuration with a log file, logging level, and format.
 
+    Request threads only put records on an in-memory queue; a background listener
+    does the file writes, so logging never blocks a request on disk I/O.
+
+    The level comes from the LOG_LEVEL environment variable (default INFO); set it to
+    WARNING in production to skip the per-request info lines entirely.
+
     Returns:
         Logger: Configured logger instance.
     """
-    logging.basicConfig(
-        filename='app.log',
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(filename)s - %(message)s'
-    )
+    global _listener
+    root = logging.getLogger()
+
+    if _listener is None:
+        file_handler = logging.FileHandler('app.log')
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(filename)s - %(message)s'))
+
+        log_queue = queue.Queue(-1)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        load_dotenv()
+        root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
 
     # Ignore some debug logs that contain private information (API Key)
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
-    return logging.getLogger()
\ No newline at end of file
+    return root
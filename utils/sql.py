@@ -1,12 +1,33 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
 from utils.logger import setup_logger
 
+load_dotenv()
 logger = setup_logger()
 
-def get_db_connection():
+DB_PATH = 'db/weather.db'
+# Upper bound on open connections; size it to the number of threads serving requests
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+
+# Idle connections are kept here and reused across requests instead of reopening the file each time
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_pool_lock = threading.Lock()
+_connections_created = 0
+
+# PRAGMA optimize refreshes the query planner's statistics; it is run on a returned connection at most this often
+OPTIMIZE_INTERVAL = 900
+_last_optimize = time.monotonic()
+_optimize_lock = threading.Lock()
+
+def _create_connection():
     """
-    Establish connection to SQLite database.
-    
+    Open a new SQLite connection configured for use by the pool.
+
     Returns:
         sqlite3.Connection: Database connection object.
 
@@ -14,9 +35,93 @@ def get_db_connection():
         sqlite3.Error: If there is an issue with the database connection.
     """
     try:
-        conn = sqlite3.connect('db/weather.db')
+        # IMMEDIATE makes the implicit BEGIN before a write take the write lock up front, rather than
+        # upgrading a deferred read transaction at commit time; with timeout=30 (SQLite's busy_timeout) a
+        # writer that finds the lock held waits in SQLite instead of raising "database is locked".
+        # Pooled connections live for the whole process, so a large prepared-statement cache stays warm.
+        conn = sqlite3.connect(
+            DB_PATH, timeout=30, check_same_thread=False, isolation_level='IMMEDIATE', cached_statements=512
+        )
+
+        # row_factory stays the default: plain tuples are built and indexed in C, unlike sqlite3.Row's by-name lookups
+        # journal_mode=WAL is set once by setup_db.py at startup; these settings are per connection
         conn.execute('PRAGMA foreign_keys = ON;')
+        conn.execute('PRAGMA synchronous = NORMAL;')
+        conn.execute('PRAGMA temp_store = MEMORY;')
+        conn.execute('PRAGMA mmap_size = 268435456;')
+        # 20 MB page cache per connection (negative values are KiB)
+        conn.execute('PRAGMA cache_size = -20000;')
         return conn
     except sqlite3.Error as e:
-        logger.error(f"Database connection error: {e}")
-        raise
\ No newline at end of file
+        logger.error("Database connection error: %s", e)
+        raise
+
+def _acquire_connection():
+    """
+    Take an idle connection from the pool, opening a new one if the pool is not yet full.
+    Blocks until a connection is returned once POOL_SIZE connections are in use.
+
+    Returns:
+        sqlite3.Connection: Database connection object.
+    """
+    global _connections_created
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _pool_lock:
+        if _connections_created < POOL_SIZE:
+            conn = _create_connection()
+            _connections_created += 1
+            return conn
+
+    return _pool.get()
+
+def pool_stats():
+    """
+    Report how full the connection pool is, without touching the database.
+
+    Returns:
+        dict: The pool's size, the connections opened so far and how many of them are idle.
+    """
+    return {'size': POOL_SIZE, 'open': _connections_created, 'idle': _pool.qsize()}
+
+def _maybe_optimize(conn):
+    """
+    Run PRAGMA optimize on the connection if OPTIMIZE_INTERVAL has passed since the last run.
+
+    Args:
+        conn (sqlite3.Connection): An idle connection, outside any transaction.
+    """
+    global _last_optimize
+    with _optimize_lock:
+        if time.monotonic() - _last_optimize < OPTIMIZE_INTERVAL:
+            return
+        _last_optimize = time.monotonic()
+    try:
+        conn.execute('PRAGMA optimize;')
+    except sqlite3.Error as e:
+        logger.warning("PRAGMA optimize failed: %s", e)
+
+@contextmanager
+def get_db_connection():
+    """
+    Borrow a pooled connection to the SQLite database.
+
+    The connection is committed on success, rolled back on error, and returned
+    to the pool afterwards rather than being closed.
+
+    Yields:
+        sqlite3.Connection: Database connection object.
+
+    Raises:
+        sqlite3.Error: If there is an issue with the database connection.
+    """
+    conn = _acquire_connection()
+    try:
+        with conn:
+            yield conn
+    finally:
+        _maybe_optimize(conn)
+        _pool.put(conn)
@@ -0,0 +1,5 @@
+# WSGI entry point for production servers, e.g. `gunicorn -c gunicorn.conf.py wsgi:application`
+
+from app import app as application
+
+__all__ = ['application']